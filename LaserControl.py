@@ -11,18 +11,24 @@ import LaserControlMainWindow
 import laser_communication
 from PyQt5.QtWidgets import QApplication, QMainWindow, QErrorMessage
 
-from PyQt5.QtCore import  pyqtSignal
+from PyQt5.QtCore import  pyqtSignal, QTimer
 import time
+import math
 import logging
 import serial.tools.list_ports
 
+from laser_protocol import STATUS_FIELD_BITS, ALL_STATUS_FIELDS
+
+#seconds between two refreshes of the status displays, one frame at 60 Hz
+DEFAULT_REFRESH_INTERVAL = 1.0 / 60
+
 class LaserControl(QMainWindow):
     
     set_repetition_rate_signal = pyqtSignal(int)
     set_repetition_quantity_signal = pyqtSignal(int)
     
-    def __init__(self, app):
-        super(self.__class__, self).__init__()
+    def __init__(self, app, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        super(LaserControl, self).__init__()
         logging.info("Initializing LaserControl GUI")
         self.app = app
         self.ui = LaserControlMainWindow.Ui_MainWindow()
@@ -31,6 +37,21 @@ class LaserControl(QMainWindow):
         self.setFixedSize(self.size())
         
         self.error_window = None
+        
+        #snapshots arriving within refresh_interval seconds of the last
+        #refresh are merged into one; 0 refreshes on every snapshot
+        self.refresh_interval = refresh_interval
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.refresh_status_displays)
+        self.last_refresh = -math.inf
+        #LaserStatus snapshot the widgets show and the one waiting for the next
+        #refresh, together with the fields changed since the shown one
+        self.displayed_status = None
+        self.pending_status = None
+        self.pending_changes = 0
+        self.shown_values = {}
+        self.status_displays = self.create_status_displays()
         self.ui.redetect_com_button.clicked.connect(self.redetect_laser)
         
         self.connect_to_laser()
@@ -49,6 +70,8 @@ class LaserControl(QMainWindow):
         self.display_repetition_frequency = True
         self.last_transmitted_quantity = -1.0
         self.last_transmitted_frequency = -1.0
+        #draw every status display again for the new connection
+        self.shown_values = {}
 
         
         
@@ -56,21 +79,12 @@ class LaserControl(QMainWindow):
         self.app.processEvents()
         
         try:
-            self.laser_communication_thread = laser_communication.LaserCommunicationThread(self, debug=False)
+            self.laser_communication_thread = self.create_laser_communication_thread()
         
             
             logging.info("Connecting GUI signals")
-            self.ui.stop_button.clicked.connect(self.laser_communication_thread.Stop)
-            self.ui.burst_on_button.clicked.connect(self.laser_communication_thread.BurstOn)
-            self.ui.laser_off_button.clicked.connect(self.laser_communication_thread.LaserOff)
-            self.ui.standby_button.clicked.connect(self.laser_communication_thread.LaserOn)
-            self.ui.toggle_shutter_button.clicked.connect(self.laser_communication_thread.ToggleShutter)
-            self.ui.external_trigger_on_button.clicked.connect(self.laser_communication_thread.ExternalTriggerOn)
-            self.ui.repetition_on_button.clicked.connect(self.laser_communication_thread.RepetitionOn)
-            self.ui.repetition_rate_spinBox.editingFinished.connect(self.repetition_rate_changed)
-            self.set_repetition_rate_signal.connect(self.laser_communication_thread.setRepetitionRate)
-            self.ui.repetition_quantity_spinBox.editingFinished.connect(self.repetition_quantity_changed)
-            self.set_repetition_quantity_signal.connect(self.laser_communication_thread.setRepetitionQuantity)
+            for signal, slot in self.gui_connections():
+                signal.connect(slot)
              
 
 
@@ -80,7 +94,41 @@ class LaserControl(QMainWindow):
             self.error_window = QErrorMessage(self)
             self.error_window.message = str(e)
             
+    def create_laser_communication_thread(self):
+        return laser_communication.LaserCommunicationThread(self, debug=False)
+        
+    def gui_connections(self):
+        """ (signal, slot) pairs between the GUI and the laser communication thread. """
+        thread = self.laser_communication_thread
+        return ((self.ui.stop_button.clicked, thread.Stop),
+                (self.ui.burst_on_button.clicked, thread.BurstOn),
+                (self.ui.laser_off_button.clicked, thread.LaserOff),
+                (self.ui.standby_button.clicked, thread.LaserOn),
+                (self.ui.toggle_shutter_button.clicked, thread.ToggleShutter),
+                (self.ui.external_trigger_on_button.clicked, thread.ExternalTriggerOn),
+                (self.ui.repetition_on_button.clicked, thread.RepetitionOn),
+                (self.ui.repetition_rate_spinBox.editingFinished, self.repetition_rate_changed),
+                (self.set_repetition_rate_signal, thread.setRepetitionRate),
+                (self.ui.repetition_quantity_spinBox.editingFinished, self.repetition_quantity_changed),
+                (self.set_repetition_quantity_signal, thread.setRepetitionQuantity))
+
+    def disconnect_from_laser(self):
+        """ Stop the laser communication thread and detach it from the GUI. """
+        if getattr(self, "laser_communication_thread", None) is None:
+            return
+        logging.info("Disconnecting GUI signals")
+        for signal, slot in self.gui_connections():
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                #was never connected, the thread failed to start
+                pass
+        self.laser_communication_thread.alive = False
+        self.laser_communication_thread.wait()
+        self.laser_communication_thread = None
+
     def redetect_laser(self):
+        self.disconnect_from_laser()
         self.connect_to_laser()
         if self.error_window != None:
             self.error_window.showMessage(self.error_window.message)
@@ -110,35 +158,77 @@ class LaserControl(QMainWindow):
         self.set_repetition_quantity_signal.emit(self.ui.repetition_quantity_spinBox.value())
         
         
-    def display_laser_status(self):
+    def create_status_displays(self):
+        """ (field, LaserStatus.changed bit, function showing the value) of every status display. """
+        displays = (("shutter_open", self.show_shutter_state),
+                    ("burst_on", self.ui.burst_on_led.setChecked),
+                    ("repetition_on", self.ui.repetition_on_led.setChecked),
+                    ("ready", self.ui.laser_ready_led.setChecked),
+                    ("standby", self.ui.laser_on_led.setChecked),
+                    ("external_trigger_on", self.ui.external_trigger_on_led.setChecked),
+                    ("temperature1", self.ui.temperature_bar.setValue),
+                    ("quantity", self.show_repetition_quantity),
+                    ("frequency", self.show_repetition_frequency),
+                    ("quantity_counter", self.ui.repetition_bar.setValue),
+                    ("shot_counter_value", self.show_total_shots))
+        return tuple((field, STATUS_FIELD_BITS[field], show) for field, show in displays)
+        
+    def display_laser_status(self, status):
+        #merge the changes of all snapshots arriving until the next refresh;
+        #everything is redrawn after skipped snapshots or a new connection
+        previous = self.pending_status or self.displayed_status
+        if previous is None or status.sequence != previous.sequence + 1:
+            self.pending_changes = ALL_STATUS_FIELDS
+        else:
+            self.pending_changes |= status.changed
+        self.pending_status = status
+        
+        if not self.refresh_timer.isActive():
+            wait = self.last_refresh + self.refresh_interval - time.monotonic()
+            if wait > 0:
+                self.refresh_timer.start(int(math.ceil(wait * 1000)))
+            else:
+                self.refresh_status_displays()
+        
+    def refresh_status_displays(self):
+        status = self.pending_status
+        if status is None:
+            return
         logging.debug("GUI: Upadting laser status displays")
-        
-        self.ui.shutter_status_led.setChecked(self.laser_communication_thread.handler.shutter_open)
-        if self.laser_communication_thread.handler.shutter_open:
+        changed = self.pending_changes
+        self.pending_status = None
+        self.pending_changes = 0
+        self.displayed_status = status
+        self.last_refresh = time.monotonic()
+        
+        #only widgets whose value differs from the one on screen are touched
+        shown_values = self.shown_values
+        for field, bit, show in self.status_displays:
+            if changed & bit:
+                value = getattr(status, field)
+                if field not in shown_values or shown_values[field] != value:
+                    shown_values[field] = value
+                    show(value)
+        
+    def show_shutter_state(self, shutter_open):
+        self.ui.shutter_status_led.setChecked(shutter_open)
+        if shutter_open:
             self.ui.shutter_status_label.setText("Open")
         else:
             self.ui.shutter_status_label.setText("Closed")
-            
-        
-        self.ui.burst_on_led.setChecked(self.laser_communication_thread.handler.burst_on)
-        self.ui.repetition_on_led.setChecked(self.laser_communication_thread.handler.repetition_on)
-        self.ui.laser_ready_led.setChecked(self.laser_communication_thread.handler.ready)
-        self.ui.laser_on_led.setChecked(self.laser_communication_thread.handler.standby)
-        self.ui.external_trigger_on_led.setChecked(self.laser_communication_thread.handler.external_trigger_on)
         
-        self.ui.temperature_bar.setValue(self.laser_communication_thread.handler.temperature1)
+    def show_repetition_quantity(self, quantity):
+        if self.last_transmitted_quantity != quantity:
+            self.ui.repetition_quantity_spinBox.setValue(quantity)
+            self.last_transmitted_quantity = quantity
         
-        if self.last_transmitted_quantity != self.laser_communication_thread.handler.quantity:
-            self.ui.repetition_quantity_spinBox.setValue(self.laser_communication_thread.handler.quantity)
-            self.last_transmitted_quantity = self.laser_communication_thread.handler.quantity
-
-        if self.last_transmitted_frequency != self.laser_communication_thread.handler.frequency:
-            self.ui.repetition_rate_spinBox.setValue(self.laser_communication_thread.handler.frequency)
-            self.last_transmitted_frequency = self.laser_communication_thread.handler.frequency
-            
-        self.ui.repetition_bar.setValue(self.laser_communication_thread.handler.quantity_counter)
+    def show_repetition_frequency(self, frequency):
+        if self.last_transmitted_frequency != frequency:
+            self.ui.repetition_rate_spinBox.setValue(frequency)
+            self.last_transmitted_frequency = frequency
         
-        self.ui.total_shots_label.setText("Total shots:\n{}".format(self.laser_communication_thread.handler.shot_counter_value))
+    def show_total_shots(self, shot_counter_value):
+        self.ui.total_shots_label.setText("Total shots:\n{}".format(shot_counter_value))
 
 if __name__ == "__main__":
     
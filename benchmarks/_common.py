@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:12:44 2026
+
+@author: Alexander Marsteller
+
+Helpers shared by the benchmarks.
+"""
+
+import os
+import sys
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from laser_cache import CapabilityCache, PortIdentityCache
+
+
+@contextmanager
+def temporary_caches():
+    """
+    Keyword arguments with a CapabilityCache and a PortIdentityCache kept in
+    a temporary directory, so benchmarks against the simulated laser never
+    write its pseudo terminal and serial number into the user's caches.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        yield {"capability_cache": CapabilityCache(os.path.join(directory, "capabilities.json")),
+               "port_cache": PortIdentityCache(os.path.join(directory, "ports.json"))}
+
+
+def _serve_simulator(connection, baud_rate):
+    from laser_simulator import PtyLaserSimulator
+    simulator = PtyLaserSimulator(baud_rate=baud_rate)
+    connection.send(simulator.start())
+    connection.recv()
+    simulator.stop()
+
+
+@contextmanager
+def simulated_laser(baud_rate=9600):
+    """
+    Device name of the simulated laser, paced at ``baud_rate`` and served on
+    a pseudo terminal from a separate process so that its CPU time is not
+    counted. The simulator stops when the block is left.
+    """
+    parent_connection, child_connection = multiprocessing.Pipe()
+    simulator = multiprocessing.Process(target=_serve_simulator, args=(child_connection, baud_rate))
+    simulator.start()
+    try:
+        yield parent_connection.recv()
+    finally:
+        parent_connection.send("stop")
+        simulator.join()
+
+
+def percentile(values, fraction):
+    """ Nearest rank percentile, ``fraction`` between 0 and 1, of a non-empty sequence. """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:18:44 2026
+
+@author: Alexander Marsteller
+
+Many concurrent operations on one event loop with the asyncio client.
+
+The simulated laser is served on a pseudo terminal from a separate process.
+AsyncLaser connects to it and the given number of operations (alternately
+GetStat7 and SetRepetitionFrequency) are all scheduled at once with
+asyncio.gather. The benchmark reports the time until all completed, the
+latency percentiles of the queries, the CPU time of this process per
+operation and the number of threads it ran with.
+
+Usage:
+    python benchmarks/bench_async_client.py [operations]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import laser_async
+from _common import simulated_laser, percentile
+
+
+async def run(port, operations):
+    laser = await laser_async.open_laser(port, discover=False)
+    latencies = []
+    threads = [threading.active_count()]
+
+    async def query():
+        sent = time.perf_counter()
+        await laser.stat7()
+        latencies.append(time.perf_counter() - sent)
+        threads[0] = max(threads[0], threading.active_count())
+
+    async def command(i):
+        await laser.set_repetition_rate(10 + i % 10)
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*[query() if i % 2 == 0 else command(i) for i in range(operations)])
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    await laser.close()
+    return elapsed, cpu, latencies, threads[0]
+
+
+def main(operations=500):
+    with simulated_laser() as port:
+        elapsed, cpu, latencies, threads = asyncio.run(run(port, operations))
+
+    print("{} operations on one event loop, {} thread(s)".format(operations, threads))
+    print("  all done after {:.2f} s ({:.0f} operations/s, limited by the 9600 baud line)".format(
+        elapsed, operations / elapsed))
+    print("  CPU {:.0f} us per operation".format(cpu / operations * 1e6))
+    print("  query latency median {:.0f} ms   p90 {:.0f} ms   max {:.0f} ms".format(
+        percentile(latencies, 0.5) * 1e3, percentile(latencies, 0.9) * 1e3, max(latencies) * 1e3))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:52:36 2026
+
+@author: Alexander Marsteller
+
+Command throughput of the communication thread on a faulty line.
+
+For every fault profile in laser_simulator.FAULT_PROFILES a simulated laser
+is served on a pseudo terminal through a FaultInjector and
+LaserCommunicationThread connects to it like to a real port. GetStat7 is
+then sent in a closed loop (next command when the previous one resolved)
+and the benchmark reports:
+
+    throughput  confirmed replies per second
+    loss        share of commands that timed out
+    recovery    time from the first failed command of an outage to the
+                next confirmed reply (mean and max)
+
+Usage:
+    python benchmarks/bench_fault_injection.py [seconds per profile] [profile ...]
+"""
+
+import os
+import sys
+import time
+import threading
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from PyQt5.QtCore import QCoreApplication
+
+import laser_communication
+from laser_simulator import PtyLaserSimulator, FaultInjector, FAULT_PROFILES
+from bench_shutter_latency import HeadlessWindow
+from _common import temporary_caches
+
+
+COMMAND_TIMEOUT = 0.5
+
+
+class ClosedLoop(object):
+    """ Keeps exactly one GetStat7 in flight and records how each ended. """
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.results = []
+        self.running = True
+        self._lock = threading.Lock()
+
+    def submit(self):
+        if self.running:
+            sent = time.monotonic()
+            future = self.thread.execute_command("GetStat7", timeout=COMMAND_TIMEOUT)
+            future.add_done_callback(lambda f: self._done(f, sent))
+
+    def _done(self, future, sent):
+        if not self.running:
+            return
+        with self._lock:
+            self.results.append((sent, time.monotonic(), future.exception() is None))
+        self.submit()
+
+
+def recovery_times(results):
+    recoveries = []
+    outage_start = None
+    for sent, done, ok in sorted(results):
+        if not ok and outage_start is None:
+            outage_start = sent
+        elif ok and outage_start is not None:
+            recoveries.append(done - outage_start)
+            outage_start = None
+    return recoveries
+
+
+def run_profile(app, name, seconds):
+    faults = FaultInjector(FAULT_PROFILES[name], seed=1)
+    simulator = PtyLaserSimulator(faults=faults)
+    simulator.start()
+    with temporary_caches() as caches:
+        window = HeadlessWindow(app)
+        thread = laser_communication.LaserCommunicationThread(window, com_port=simulator.port, **caches)
+        thread.start()
+        time.sleep(2.5)
+
+        loop = ClosedLoop(thread)
+        start = time.monotonic()
+        loop.submit()
+        while time.monotonic() - start < seconds:
+            app.processEvents()
+            time.sleep(0.01)
+        loop.running = False
+        elapsed = time.monotonic() - start
+        thread.alive = False
+        thread.wait()
+    simulator.stop()
+
+    results = list(loop.results)
+    confirmed = sum(1 for sent, done, ok in results if ok)
+    recoveries = recovery_times(results)
+    return {"throughput": confirmed / elapsed,
+            "loss": 1.0 - confirmed / float(len(results)) if results else 0.0,
+            "recovery_mean": sum(recoveries) / len(recoveries) if recoveries else 0.0,
+            "recovery_max": max(recoveries) if recoveries else 0.0,
+            "outages": len(recoveries),
+            "decode_errors": thread.link.decode_errors,
+            "bad_frames": thread.link.framer.bad_frames}
+
+
+def main(seconds=15.0, *profiles):
+    logging.getLogger().setLevel(logging.ERROR)
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    print("{:<14} {:>10} {:>8} {:>8} {:>13} {:>12} {:>8}".format(
+        "profile", "cmds/s", "loss", "outages", "recovery [s]", "max [s]", "bad FCS"))
+    for name in profiles or sorted(FAULT_PROFILES):
+        r = run_profile(app, name, seconds)
+        print("{:<14} {:>10.1f} {:>7.1%} {:>8} {:>13.3f} {:>12.3f} {:>8}".format(
+            name, r["throughput"], r["loss"], r["outages"], r["recovery_mean"], r["recovery_max"],
+            r["bad_frames"]))
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:2]], *sys.argv[2:])
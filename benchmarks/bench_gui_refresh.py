@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:48:05 2026
+
+@author: Alexander Marsteller
+
+CPU time the main window spends on showing the laser status.
+
+Runs the LaserControl window (on the offscreen Qt platform unless
+QT_QPA_PLATFORM is set) against the simulated laser, served on a pseudo
+terminal from a separate process. The laser fires at 99 Hz so the
+counters change with every GetStat8, and the status is polled as fast as
+the line allows, paced at 115200 baud by default. For every refresh
+interval the benchmark reports the CPU time of the GUI thread in percent
+of one core, the status snapshots the window received, the refreshes it
+drew and the widgets it touched, per second. An interval of 0 refreshes
+on every snapshot.
+
+Usage:
+    python benchmarks/bench_gui_refresh.py [--duration 10] [--poll-interval 0.002] [--baud-rate 115200]
+                                           [--intervals 0,0.0167]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import serial.tools.list_ports
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+import LaserControl
+import laser_communication
+from _common import temporary_caches, simulated_laser
+
+
+class _SimulatorPort(object):
+    vid = None
+    pid = None
+    serial_number = None
+
+    def __init__(self, device):
+        self.device = device
+
+
+class CountingLaserControl(LaserControl.LaserControl):
+    """ LaserControl counting received snapshots, refreshes and touched widgets. """
+
+    def __init__(self, app, refresh_interval, caches):
+        self.caches = caches
+        self.snapshots = 0
+        self.refreshes = 0
+        self.widget_updates = 0
+        LaserControl.LaserControl.__init__(self, app, refresh_interval)
+
+    def create_laser_communication_thread(self):
+        return laser_communication.LaserCommunicationThread(self, debug=False, **self.caches)
+
+    def create_status_displays(self):
+        def counting(show):
+            def counted(value):
+                self.widget_updates += 1
+                show(value)
+            return counted
+        return tuple((field, bit, counting(show))
+                     for field, bit, show in LaserControl.LaserControl.create_status_displays(self))
+
+    def display_laser_status(self, status):
+        self.snapshots += 1
+        LaserControl.LaserControl.display_laser_status(self, status)
+
+    def refresh_status_displays(self):
+        if self.pending_status is not None:
+            self.refreshes += 1
+        LaserControl.LaserControl.refresh_status_displays(self)
+
+
+def run_window(app, refresh_interval, duration, poll_interval, polling_budget, caches):
+    """ (GUI thread CPU seconds, snapshots, refreshes, widget updates) while firing for ``duration`` seconds. """
+    window = CountingLaserControl(app, refresh_interval, caches)
+    window.show()
+    thread = window.laser_communication_thread
+    thread.LaserOn()
+    thread.RepetitionOn()
+    thread.setRepetitionRate(99)
+    #bits per second the polls may take, applied together with the poll interval
+    thread.poller.budget = polling_budget
+    thread.status_poll_interval = poll_interval
+
+    #let the connection settle before measuring
+    QTimer.singleShot(1000, app.quit)
+    app.exec_()
+    counts = (window.snapshots, window.refreshes, window.widget_updates)
+    cpu = time.thread_time()
+    QTimer.singleShot(int(duration * 1000), app.quit)
+    app.exec_()
+    cpu = time.thread_time() - cpu
+    counts = [after - before for after, before in
+              zip((window.snapshots, window.refreshes, window.widget_updates), counts)]
+
+    thread.Stop()
+    window.disconnect_from_laser()
+    window.close()
+    return [cpu] + counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per refresh interval")
+    parser.add_argument("--poll-interval", type=float, default=0.002,
+                        help="status poll interval of the thread (0.5 as designed)")
+    parser.add_argument("--baud-rate", type=int, default=115200,
+                        help="baud rate the simulator is paced at and the polling is budgeted for")
+    parser.add_argument("--bus-fraction", type=float, default=1.0, help="share of the line the polls may take")
+    parser.add_argument("--intervals", type=lambda text: [float(i) for i in text.split(",")],
+                        default=[0.0, LaserControl.DEFAULT_REFRESH_INTERVAL],
+                        help="comma separated refresh intervals in seconds")
+    arguments = parser.parse_args()
+
+    with simulated_laser(arguments.baud_rate) as port:
+        serial.tools.list_ports.comports = lambda: [_SimulatorPort(port)]
+
+        app = QApplication.instance() or QApplication(sys.argv)
+        print("{:>10} {:>9} {:>12} {:>12} {:>16}".format("interval", "GUI CPU", "snapshots/s", "refreshes/s",
+                                                         "widget updates/s"))
+        for interval in arguments.intervals:
+            with temporary_caches() as caches:
+                cpu, snapshots, refreshes, widget_updates = run_window(app, interval, arguments.duration,
+                                                                       arguments.poll_interval,
+                                                                       arguments.bus_fraction * arguments.baud_rate,
+                                                                       caches)
+            duration = arguments.duration
+            print("{:>8.1f}ms {:>8.1f}% {:>12.1f} {:>12.1f} {:>16.1f}".format(
+                interval * 1e3, cpu / duration * 100, snapshots / duration, refreshes / duration,
+                widget_updates / duration))
+
+
+if __name__ == "__main__":
+    main()
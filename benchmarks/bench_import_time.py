@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:02:47 2026
+
+@author: Alexander Marsteller
+
+Import time of the library modules.
+
+Every module is imported in a fresh interpreter, several times, and the
+fastest run counts. Besides the time the benchmark lists which of the
+expensive optional dependencies (PyQt5, NumPy, asyncio) the import pulled
+in. The protocol core and the serial transport must not load any of them;
+with --check the benchmark exits with status 1 if one does, or if a core
+module takes longer than --budget milliseconds on top of pyserial.
+
+Usage:
+    python benchmarks/bench_import_time.py [--repetitions 5] [--check] [--budget 20]
+"""
+
+import os
+import sys
+import json
+import argparse
+import compileall
+import subprocess
+
+BASE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# modules headless code imports, none of them may need Qt or NumPy
+CORE_MODULES = ("laser_protocol", "laser_handler", "laser_communication", "laser_transport",
+                "laser_ports", "laser_cache")
+FRONTEND_MODULES = ("laser_async", "laser_thread", "LaserControl")
+HEAVY_MODULES = ("PyQt5", "numpy", "asyncio")
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def import_time(module, repetitions=5):
+    """ Fastest of ``repetitions`` imports of ``module`` in a new interpreter: (ms, heavy modules loaded). """
+    best = None
+    for i in range(repetitions):
+        output = subprocess.check_output([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                         cwd=BASE_DIRECTORY)
+        elapsed, loaded = json.loads(output.decode("ASCII").strip().splitlines()[-1])
+        if best is None or elapsed < best[0]:
+            best = (elapsed, loaded)
+    return best[0] * 1e3, best[1]
+
+
+def import_times(repetitions=5):
+    """ {module: {"ms": ..., "loads": [...]}} for pyserial and all library modules. """
+    #time the import, not compiling the sources to byte code
+    compileall.compile_dir(BASE_DIRECTORY, maxlevels=0, quiet=1)
+    results = {}
+    for module in ("serial",) + CORE_MODULES + FRONTEND_MODULES:
+        milliseconds, loaded = import_time(module, repetitions)
+        results[module] = {"ms": milliseconds, "loads": loaded}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    parser.add_argument("--repetitions", type=int, default=5, help="imports per module, the fastest counts")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if the core is too slow or heavy")
+    parser.add_argument("--budget", type=float, default=20.0,
+                        help="milliseconds a core module may take on top of pyserial")
+    arguments = parser.parse_args()
+
+    results = import_times(arguments.repetitions)
+    serial_ms = results["serial"]["ms"]
+    failed = False
+    print("{:<22} {:>9} {:>9}  loads".format("module", "ms", "+serial"))
+    for module, result in results.items():
+        extra = result["ms"] - serial_ms
+        problem = ""
+        if module in CORE_MODULES and (result["loads"] or extra > arguments.budget):
+            problem = "  <- core module too slow or loads optional dependencies"
+            failed = True
+        print("{:<22} {:>9.1f} {:>9.1f}  {}{}".format(module, result["ms"], extra,
+                                                     ", ".join(result["loads"]) or "-", problem))
+    if arguments.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:47:09 2026
+
+@author: Alexander Marsteller
+
+Click-to-wire latency of safety commands behind a backlog of status polls.
+
+Floods a SerialLink on a port paced like a 9600 baud line with GetStat7
+polls, queues LaserStop at random moments and reports the time until its
+frame has left the port, next to the bound given by
+SerialLink.send_latency_bound().
+
+Usage:
+    python benchmarks/bench_priority_latency.py [trials]
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from laser_protocol import command_priority, PRIORITY_SAFETY, PRIORITY_TELEMETRY
+from laser_transport import SerialLink, CommandRequest
+from laser_communication import LaserCommunicationHandler
+
+
+BAUD_RATE = 9600
+
+
+class PacedPort(object):
+    """ Answers GetStat7 and takes 10 bit times per byte to transmit. """
+
+    def __init__(self, baud_rate=BAUD_RATE):
+        self.byte_time = 10.0 / baud_rate
+        self.timeout = 0.2
+        self._pending = 0
+        self._buffer = b""
+        self._condition = threading.Condition()
+
+    @property
+    def in_waiting(self):
+        return len(self._buffer)
+
+    def write(self, frame):
+        self._pending = len(frame)
+        if frame.startswith(b"#!@UT"):
+            with self._condition:
+                self._buffer += b"<@!UT04000200320A64000000008C\r"
+                self._condition.notify_all()
+
+    def flush(self):
+        time.sleep(self._pending * self.byte_time)
+        self._pending = 0
+
+    def read(self, size=1):
+        with self._condition:
+            if not self._buffer:
+                self._condition.wait(self.timeout)
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def cancel_read(self):
+        with self._condition:
+            self._condition.notify_all()
+
+
+def main(trials=50):
+    handler = LaserCommunicationHandler()
+    port = PacedPort()
+    link = SerialLink(port, lambda *reply: None, handler.decode_reply)
+    reader = threading.Thread(target=link.run_reader)
+    reader.daemon = True
+    link.start()
+    reader.start()
+
+    poll = handler.encode_command("GetStat7")
+    stop = handler.encode_command("LaserStop")
+    latencies = []
+    for i in range(trials):
+        for j in range(20):
+            link.request(CommandRequest("GetStat7", poll, "GetStat7", timeout=10.0,
+                                        priority=command_priority("GetStat7")))
+        time.sleep(random.uniform(0.0, 0.05))
+        start = time.monotonic()
+        link.request(CommandRequest("LaserStop", stop, priority=command_priority("LaserStop"))).result()
+        latencies.append(time.monotonic() - start)
+
+    link.stop()
+    link.join()
+
+    longest_frame = handler.command_encoder.longest_frame()
+    print("LaserStop behind polls, {} trials at {} baud".format(trials, BAUD_RATE))
+    print("  bound {:.1f} ms   observed max {:.1f} ms   mean {:.1f} ms".format(
+        SerialLink.send_latency_bound(longest_frame, BAUD_RATE) * 1e3,
+        max(latencies) * 1e3, sum(latencies) / len(latencies) * 1e3))
+    print("  max queue-to-wire per class: safety {:.1f} ms   telemetry {:.1f} ms".format(
+        link.max_send_latency[PRIORITY_SAFETY] * 1e3, link.max_send_latency[PRIORITY_TELEMETRY] * 1e3))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:05:19 2026
+
+@author: Alexander Marsteller
+
+Decoder throughput on recorded traffic.
+
+Imports communications_log.txt (or replays a given capture file) and feeds
+the received bytes through LaserCommunicationHandler as fast as possible,
+reporting frames per second and what was decoded. The decoded counts are
+the same on every run, so a change in them points at a decoder regression.
+
+Usage:
+    python benchmarks/bench_replay.py [repetitions] [capture file]
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from laser_communication import LaserCommunicationHandler
+from laser_capture import import_communications_log, read_capture, replay
+
+
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "communications_log.txt")
+
+
+def main(repetitions=1000, capture_path=None):
+    if capture_path is None:
+        with tempfile.TemporaryDirectory() as directory:
+            capture_path = os.path.join(directory, "communications_log.cap")
+            exchanges = import_communications_log(LOG_PATH, capture_path)
+            print("imported {} exchanges from {}".format(exchanges, os.path.basename(LOG_PATH)))
+            records = list(read_capture(capture_path))
+    else:
+        records = list(read_capture(capture_path))
+
+    handler = LaserCommunicationHandler()
+    result = replay(records * repetitions, handler)
+    print("frames: {}  errors: {}  bad FCS: {}  discarded bytes: {}".format(
+        result.frames, result.errors, result.bad_frames, result.discarded_bytes))
+    for response_type, count in sorted(result.replies.items()):
+        print("  {:<20} {:>8}".format(response_type, count))
+    print("{:.0f} frames/s ({:.2f} us per frame)".format(result.frames / result.elapsed,
+                                                        result.elapsed / result.frames * 1e6))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]], *sys.argv[2:3])
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 11:02:37 2026
+
+@author: Alexander Marsteller
+
+Microbenchmark for reply decoding.
+
+Compares LaserCommunicationHandler.decode_reply against the original
+eval() based implementation (kept below as LegacyReplyDecoder for reference)
+on replies recorded from our lasers. The speedup is that of decoding alone;
+apply_reply, which publishes the record and for GetEnergyValues also feeds
+the energy history and statistics, is timed separately. The last line
+states the speedup reached against the order of magnitude aimed for.
+
+Usage:
+    python benchmarks/bench_reply_decoder.py [repetitions]
+"""
+
+import os
+import sys
+import timeit
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from laser_communication import LaserCommunicationHandler
+
+
+RECORDED_REPLIES = [
+    "<@!W0054\r",
+    "<@!UT04000200320A64000000008C\r",
+    "<@!UU0000D61E2500000000004602E685\r",
+    "<@!P141464006407640E6415641C6423642A64316438643F6446644D6454645B6462646964706477647E64858C\r",
+]
+
+
+class LegacyReplyDecoder(object):
+    """ The string and eval() based decoder as it was before the dispatcher. """
+
+    def __init__(self):
+        self.end_delimiter = "\r"
+        self.response_start_delimiter = "<"
+        self.destination_address = "!"
+        self.source_address = "@"
+        self.reply_directory = {"W": "GetShortStatus", "UT": "GetStat7", "UU": "GetStat8",
+                                "US": "GetSernum", "UV": "GetAttenuatorStatus",
+                                "P": "GetEnergyValues", "V": "GetVer3"}
+        self.energy_values = []
+
+    def _calculate_frame_check_squence(self, telegram):
+        logging.debug("Calculating frame check sequence for: {}".format(telegram))
+        encoded_telegram = telegram.encode("ASCII")
+        fcs = hex(sum(bytearray(encoded_telegram)) % 256).upper()[2:]
+        logging.debug("Calculated frame check sequence: {}".format(fcs))
+        return fcs
+
+    def _flag_byte_decoder(self, flag_byte):
+        binary_string = format(flag_byte, '#010b')[2:]
+        truth_array = [i=="1" for i in list(binary_string)]
+        return truth_array[::-1]
+
+    def _interprete_response(self, reply):
+        cleaned_reply = reply.rstrip(self.end_delimiter)
+        logging.debug("Interpreting response: {}".format(cleaned_reply))
+        logging.debug("Checking response integrity with frame check sequence")
+        reply_fcs = cleaned_reply[-2:]
+        calculated_reply_fcs = self._calculate_frame_check_squence(cleaned_reply[:-2])
+        if reply_fcs != calculated_reply_fcs:
+            raise IOError()
+        else:
+            cleaned_reply = cleaned_reply.rstrip(reply_fcs)
+        cleaned_reply = cleaned_reply.lstrip(self.response_start_delimiter).lstrip(self.source_address).lstrip(self.destination_address)
+        logging.debug("Determining response type.")
+        response_type = None
+        for key in self.reply_directory.keys():
+            if cleaned_reply[:len(key)] == key:
+                response_type = self.reply_directory[key]
+                logging.debug("Response type determined: {}".format(response_type))
+                break
+        if response_type != None:
+            logging.debug("Interpreting {} type response.".format(response_type))
+            eval("self._interprete_{}(cleaned_reply)".format(response_type))
+            return response_type
+
+    def _interprete_GetShortStatus(self, reply):
+        response_dict = {"00":"Standby", "01":"Laser is Working", "03":"EEPROM Error",
+                         "04":"Energy Monitor Error occured", "05":"Temperature too high (>48°C)",
+                         "06":"Static Error", "07":"Operation Error: Laser mus be switched off"}
+        return response_dict[reply[1:]]
+
+    def _interprete_GetStat7(self, reply):
+        cleaned_reply = reply[2:]
+        self.flag_byte_1 = int(cleaned_reply[:2],16)
+        self.flag_byte_3 = int(cleaned_reply[4:6],16)
+        self.quantity = int(cleaned_reply[6:10],16)
+        self.frequency = int(cleaned_reply[10:12],16)
+        self.hv = int(cleaned_reply[12:14],16)
+        try:
+            self.energy = int(cleaned_reply[18:22],16)
+        except Exception:
+            pass
+        self.flag_byte_1 = self._flag_byte_decoder(self.flag_byte_1)
+        self.flag_byte_3 = self._flag_byte_decoder(self.flag_byte_3)
+        self.shutter_open = self.flag_byte_1[0]
+        self.ready = self.flag_byte_1[2]
+        self.standby = self.flag_byte_1[3]
+        self.mode_off = self.flag_byte_1[7]
+        self.repetition_on = self.flag_byte_1[4]
+        self.burst_on = self.flag_byte_1[5]
+        self.external_trigger_on = self.flag_byte_1[6]
+        self.service_mode_activated = self.flag_byte_3[0]
+        self.eeprom_error = self.flag_byte_3[5]
+        self.cpu_error = self.flag_byte_3[6]
+
+    def _interprete_GetStat8(self, reply):
+        cleaned_reply = reply[2:]
+        self.flag_byte_4 = int(cleaned_reply[:2],16)
+        self.flag_byte_5 = int(cleaned_reply[2:4],16)
+        self.internal_voltage = int(cleaned_reply[4:6],16)
+        self.temperature1 = int(cleaned_reply[6:8],16)
+        self.temperature2 = int(cleaned_reply[8:10],16)
+        self.energy = int(cleaned_reply[10:14],16)
+        self.quantity_counter = int(cleaned_reply[14:18],16)
+        self.shot_counter_value = int(cleaned_reply[18:26],16)
+        self.flag_byte_4 = self._flag_byte_decoder(self.flag_byte_4)
+        self.static_error = self.flag_byte_4[0]
+        self.laser_head_open = self.flag_byte_4[1]
+        self.remote = self.flag_byte_4[2]
+        self.temperature_limit = self.flag_byte_4[3]
+        self.temperature_warning_1 = self.flag_byte_4[4]
+        self.temperature_warning_2 = self.flag_byte_4[5]
+        self.energy_monitor_error = self.flag_byte_4[6]
+        self.flag_byte_5 = self._flag_byte_decoder(self.flag_byte_5)
+        self.operation_error = self.flag_byte_5[0]
+        self.hv_error = self.flag_byte_5[3]
+        self.temperature_error_1 = self.flag_byte_5[4]
+        self.temperature_error_2 = self.flag_byte_5[5]
+        self.power_supply_error = self.flag_byte_5[6]
+        self.power_supply_weak = self.flag_byte_5[7]
+
+    def _interprete_GetEnergyValues(self, reply):
+        cleaned_reply = reply[1:]
+        following_energy_values = int(cleaned_reply[2:4],16)
+        for i in range(following_energy_values):
+            energy = int(cleaned_reply[4+4*i:4+4*(i+1)],16) * 250/64000 # micro Joule
+            self.energy_values.append(energy)
+
+
+def time_per_call(function, argument, repetitions):
+    timer = timeit.Timer(lambda: function(argument))
+    return min(timer.repeat(5, repetitions)) / repetitions
+
+
+def main(repetitions=20000):
+    legacy = LegacyReplyDecoder()
+    handler = LaserCommunicationHandler()
+
+    print("{:<40} {:>12} {:>12} {:>12} {:>8}".format("reply", "legacy [us]", "decode [us]", "apply [us]",
+                                                     "speedup"))
+    speedups = []
+    for reply in RECORDED_REPLIES:
+        frame = reply.encode("ASCII")
+        legacy_time = time_per_call(legacy._interprete_response, reply, repetitions)
+        decode_time = time_per_call(handler.decode_reply, frame, repetitions)
+        apply_time = time_per_call(lambda decoded: handler.apply_reply(*decoded), handler.decode_reply(frame),
+                                   repetitions)
+        speedups.append(legacy_time / decode_time)
+        print("{:<40.40} {:>12.2f} {:>12.2f} {:>12.2f} {:>7.1f}x".format(reply.strip(), legacy_time * 1e6,
+                                                                 decode_time * 1e6, apply_time * 1e6,
+                                                                 speedups[-1]))
+    print("decoding is {:.1f}x to {:.1f}x faster, {} the 10x target".format(
+        min(speedups), max(speedups), "meeting" if min(speedups) >= 10 else "short of"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:48:10 2026
+
+@author: Alexander Marsteller
+
+Memory benchmark for the reply and energy history.
+
+Replays a simulated run of the given length (24 hours by default) into the
+list based history the communication thread used to keep (messages trimmed
+with pop(0), energies growing without bound) and into MessageRing and
+EnergyRing, and reports the memory held at the end and the time per reply.
+
+The simulated laser fires at 20 Hz and is polled the way PollScheduler does
+when the laser is busy: GetStat7 5/s, GetShortStatus 2/s, GetStat8 1/s and
+GetEnergyValues 1/s returning the 20 pulses since the last poll.
+
+Usage:
+    python benchmarks/bench_ring_memory.py [hours]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from laser_telemetry import EnergyRing, MessageRing
+
+
+MESSAGES_PER_SECOND = [b"<@!UT04000200320A64000000008C\r"] * 5 + [b"<@!W0054\r"] * 2 + \
+                      [b"<@!UU0000D61E2500000000004602E685\r", b"<@!P14" + b"1F40" * 20 + b"00\r"]
+PULSES_PER_SECOND = 20
+MESSAGE_LIMIT = 1000
+ENERGY_VALUE_LIMIT = 100000
+
+
+class ListHistory(object):
+    """ The history as the communication thread kept it before the rings. """
+
+    def __init__(self):
+        self.recieved_messages = []
+        self.energy_values = []
+
+    def add_message(self, message):
+        self.recieved_messages.append(message)
+        if len(self.recieved_messages) > MESSAGE_LIMIT:
+            self.recieved_messages.pop(0)
+
+    def add_energies(self, values):
+        self.energy_values.extend(values)
+
+
+class RingHistory(object):
+
+    def __init__(self):
+        self.recieved_messages = MessageRing(MESSAGE_LIMIT)
+        self.energy_values = EnergyRing(ENERGY_VALUE_LIMIT)
+
+    def add_message(self, message):
+        self.recieved_messages.append(message)
+
+    def add_energies(self, values):
+        self.energy_values.extend(values)
+
+
+def simulate(history_type, seconds):
+    energies = [3.9 + 0.01 * i for i in range(PULSES_PER_SECOND)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    history = history_type()
+    for second in range(seconds):
+        for message in MESSAGES_PER_SECOND:
+            #copy the frame like the reader does, so each reply is its own object
+            history.add_message(bytes(bytearray(message)))
+        history.add_energies(list(energies))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    replies = seconds * len(MESSAGES_PER_SECOND)
+    return current, peak, elapsed / replies
+
+
+def main(hours=24.0):
+    seconds = int(hours * 3600)
+    print("simulated run: {:.1f} h, {} replies, {} pulses".format(
+        hours, seconds * len(MESSAGES_PER_SECOND), seconds * PULSES_PER_SECOND))
+    print("{:<10} {:>14} {:>14} {:>16}".format("history", "held [MiB]", "peak [MiB]", "per reply [us]"))
+    for name, history_type in (("list", ListHistory), ("ring", RingHistory)):
+        current, peak, per_reply = simulate(history_type, seconds)
+        print("{:<10} {:>14.2f} {:>14.2f} {:>16.2f}".format(name, current / 2**20, peak / 2**20,
+                                                           per_reply * 1e6))
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:2]])
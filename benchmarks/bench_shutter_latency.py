@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:03:12 2026
+
+@author: Alexander Marsteller
+
+Latency from a shutter toggle to the confirming GetStat7 reply.
+
+Runs LaserCommunicationThread against the simulated laser (paced like a
+9600 baud line) with the periodic status poll disabled, toggles the
+shutter, queues a GetStat7 and measures the time until the reply has been
+interpreted on the Qt thread.
+
+Usage:
+    python benchmarks/bench_shutter_latency.py [trials]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from PyQt5.QtCore import QCoreApplication
+
+import laser_communication
+from _common import temporary_caches, percentile
+
+
+class _Label(object):
+    def setText(self, text):
+        pass
+
+
+class _Ui(object):
+    connection_label = _Label()
+
+
+class HeadlessWindow(object):
+    """ The parts of LaserControl the communication thread talks to. """
+
+    def __init__(self, app):
+        self.app = app
+        self.ui = _Ui()
+        self.updates = 0
+
+    def display_laser_status(self, *args):
+        self.updates += 1
+
+
+def main(trials=50):
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    with temporary_caches() as caches:
+        window = HeadlessWindow(app)
+        thread = laser_communication.LaserCommunicationThread(window, debug=True, **caches)
+        thread.status_poll_interval = 1e9
+        thread.start()
+        time.sleep(2.5)
+
+        latencies = []
+        for i in range(trials):
+            app.processEvents()
+            updates = window.updates
+            start = time.perf_counter()
+            thread.ToggleShutter()
+            thread.execute_command("GetStat7")
+            while window.updates == updates:
+                app.processEvents()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+        thread.alive = False
+        thread.wait()
+
+    print("shutter toggle -> confirmed state over {} trials".format(trials))
+    print("  median {:.1f} ms   p90 {:.1f} ms   max {:.1f} ms".format(percentile(latencies, 0.5) * 1e3,
+                                                                   percentile(latencies, 0.9) * 1e3,
+                                                                   max(latencies) * 1e3))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:36:12 2026
+
+@author: Alexander Marsteller
+
+Cost of one status update from the reply to the widgets.
+
+Replies as they arrive while polling (short status, GetStat7 and GetStat8,
+with the counters of GetStat8 running) are applied and the values the
+main window shows are read back, once for each way the GUI got its state:
+
+    legacy      the original eval() decoder setting handler attributes,
+                every displayed attribute read on every update
+    attributes  decoded records kept per reply type and read through flat
+                handler attributes, every displayed value on every update
+    snapshot    LaserStatus snapshots, only the values whose bit is set in
+                LaserStatus.changed are read and replies repeating the
+                previous one of their type produce no update at all
+
+The benchmark reports the time per update, traced with tracemalloc the
+bytes an update allocates (freed again or not) on average and at most, and
+the share of replies that reach the main window as an update.
+
+Usage:
+    python benchmarks/bench_status_snapshot.py [updates]
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from laser_handler import LaserCommunicationHandler
+from laser_protocol import REPLY_LAYOUTS, REPLY_FIELD_OWNERS, status_field_mask
+from bench_reply_decoder import LegacyReplyDecoder
+
+# the values LaserControl.display_laser_status shows
+DISPLAYED_FIELDS = ("shutter_open", "burst_on", "repetition_on", "ready", "standby", "external_trigger_on",
+                    "temperature1", "quantity", "frequency", "quantity_counter", "shot_counter_value")
+DISPLAYED_MASKS = tuple((name, status_field_mask(name)) for name in DISPLAYED_FIELDS)
+
+
+def polling_replies(count):
+    """ ``count`` replies in polling order, the shot counters advancing with every GetStat8. """
+    layouts = dict((layout.response_type, layout) for layout in REPLY_LAYOUTS)
+    stat7 = layouts["GetStat7"].encode({"shutter_open": 1, "ready": 1, "repetition_on": 1,
+                                        "quantity": 100, "frequency": 10, "hv": 50})
+    short_status = layouts["GetShortStatus"].encode({"status_code": 1})
+    replies = []
+    for i in range(count):
+        if i % 3 == 0:
+            replies.append(short_status)
+        elif i % 3 == 1:
+            replies.append(stat7)
+        else:
+            replies.append(layouts["GetStat8"].encode({"temperature1": 30 + i // 300 % 3,
+                                                       "quantity_counter": i // 3 % 100,
+                                                       "shot_counter_value": 1000 + i // 3}))
+    return replies
+
+
+class AttributeHandler(object):
+    """ Records per reply type read through flat attributes, as the handler did before snapshots. """
+
+    def __init__(self):
+        self.handler = LaserCommunicationHandler()
+        self.replies = dict((layout.response_type, layout.default_record()) for layout in REPLY_LAYOUTS)
+
+    def __getattr__(self, name):
+        try:
+            response_type = REPLY_FIELD_OWNERS[name]
+        except KeyError:
+            raise AttributeError(name)
+        return getattr(self.replies[response_type], name)
+
+    def update(self, reply):
+        response_type, record = self.handler.decode_reply(reply)
+        self.replies[response_type] = record
+
+
+def legacy_update():
+    decoder = LegacyReplyDecoder()
+
+    def update(reply):
+        decoder._interprete_response(reply.decode("ASCII"))
+        for name in DISPLAYED_FIELDS:
+            #the attributes only exist once a reply setting them arrived
+            getattr(decoder, name, None)
+        return True
+    return update
+
+
+def attribute_update():
+    handler = AttributeHandler()
+
+    def update(reply):
+        handler.update(reply)
+        for name in DISPLAYED_FIELDS:
+            getattr(handler, name)
+        return True
+    return update
+
+
+def snapshot_update():
+    handler = LaserCommunicationHandler()
+
+    def update(reply):
+        previous = handler.status
+        status = handler.apply_reply(*handler.decode_reply(reply))
+        if status is previous:
+            #a repeated reply, the thread emits no update
+            return False
+        changed = status.changed
+        for name, mask in DISPLAYED_MASKS:
+            if changed & mask:
+                getattr(status, name)
+        return True
+    return update
+
+
+def time_per_update(update, replies):
+    def run():
+        for reply in replies:
+            update(reply)
+    return min(timeit.Timer(run).repeat(5, 1)) / len(replies)
+
+
+def allocated_per_update(update, replies):
+    """ Mean and maximum bytes an update allocates, including what it frees again. """
+    tracemalloc.start()
+    allocated = []
+    for reply in replies:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        update(reply)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return sum(allocated) / len(allocated), max(allocated)
+
+
+def main(updates=3000):
+    replies = polling_replies(updates)
+    print("{} updates (short status, GetStat7, GetStat8), {} displayed values".format(updates, len(DISPLAYED_FIELDS)))
+    print("{:<12} {:>14} {:>18} {:>14} {:>12}".format("", "us per update", "bytes allocated", "max bytes",
+                                                     "GUI updates"))
+    for name, factory in (("legacy", legacy_update), ("attributes", attribute_update),
+                          ("snapshot", snapshot_update)):
+        update = factory()
+        seconds = time_per_update(update, replies)
+        mean, largest = allocated_per_update(update, replies)
+        redraws = sum(1 for reply in replies if update(reply))
+        print("{:<12} {:>14.2f} {:>18.0f} {:>14} {:>11.0f}%".format(name, seconds * 1e6, mean, largest,
+                                                                   100.0 * redraws / updates))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:10:27 2026
+
+@author: Alexander Marsteller
+
+Benchmark suite with machine readable results.
+
+Microbenchmarks time the protocol hot paths of LaserCommunicationHandler:
+compose_command, _calculate_frame_check_squence, _interprete_response for
+every reply type and _flag_byte_decoder. The import time of every library
+module is measured in fresh interpreters (see bench_import_time.py).
+
+The end-to-end part runs LaserCommunicationThread against the simulated
+laser, served on a pseudo terminal from a separate process so that its
+CPU time is not counted, and measures
+
+    latency     command-to-reply latency percentiles of GetStat7 sent in a
+                closed loop
+    polling     replies per second of the regular status polling, CPU time
+                of this process per reply (less the idle cost of the event
+                loop) and resident memory growth
+
+Results are written as JSON (to stdout or --output), together with the
+git revision, so runs of different releases can be compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output results.json] [--duration 10] [--micro-only]
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import logging
+import platform
+import argparse
+import subprocess
+import threading
+
+BASE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, BASE_DIRECTORY)
+
+from laser_communication import LaserCommunicationHandler
+from laser_simulator import LaserModel
+from bench_import_time import import_times
+from _common import temporary_caches, simulated_laser, percentile
+
+
+def time_call(function, repetitions):
+    timer = timeit.Timer(function)
+    times = [t / repetitions for t in timer.repeat(5, repetitions)]
+    return {"best_us": min(times) * 1e6, "mean_us": sum(times) / len(times) * 1e6,
+            "repetitions": repetitions}
+
+
+def recorded_replies(handler):
+    """ One reply of every type, as the simulated laser sends them while firing. """
+    model = LaserModel(seed=1)
+    for command in ("LaserOn", "RepetitionOn"):
+        model.handle(handler.encode_command(command))
+    time.sleep(0.3)
+    replies = {}
+    for command in ("GetShortStatus", "GetStat7", "GetStat8", "GetVer3", "GetSernum",
+                    "GetAttenuatorStatus", "GetEnergyValues"):
+        replies[command] = model.handle(handler.encode_command(command))
+    return replies
+
+
+def micro_benchmarks(repetitions=20000):
+    handler = LaserCommunicationHandler()
+    results = {}
+    for command, parameter in (("GetStat7", None), ("SetRepetitionFrequency", 25), ("SetBurstQuantity", 1234)):
+        name = "compose_command[{}]".format(command)
+        results[name] = time_call(lambda: handler.compose_command(command, parameter), repetitions)
+    results["_calculate_frame_check_squence"] = time_call(
+        lambda: handler._calculate_frame_check_squence("#!@UT"), repetitions)
+    for command, reply in sorted(recorded_replies(handler).items()):
+        name = "_interprete_response[{}]".format(command)
+        results[name] = time_call(lambda: handler._interprete_response(reply), repetitions)
+    results["_flag_byte_decoder"] = time_call(lambda: handler._flag_byte_decoder(0x1C), repetitions)
+    return results
+
+
+def resident_memory():
+    """ Resident set size of this process in bytes (peak where not available). """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def end_to_end_benchmarks(duration=10.0):
+    from PyQt5.QtCore import QCoreApplication
+    import laser_communication
+    from bench_shutter_latency import HeadlessWindow
+
+    with simulated_laser() as port, temporary_caches() as caches:
+        app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+        def pump(seconds, interval=0.005):
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                app.processEvents()
+                time.sleep(interval)
+
+        #CPU the event loop of this benchmark takes without any laser traffic
+        cpu = time.process_time()
+        pump(2.0, 0.05)
+        idle_cpu_rate = (time.process_time() - cpu) / 2.0
+
+        window = HeadlessWindow(app)
+        thread = laser_communication.LaserCommunicationThread(window, com_port=port, **caches)
+        thread.start()
+        time.sleep(2.5)
+
+        #regular polling only
+        pump(1.0)
+        #counted by the handler, the window only gets replies that change the status
+        replies, cpu, memory = thread.handler.replies_applied, time.process_time(), resident_memory()
+        start = time.monotonic()
+        pump(duration, 0.05)
+        elapsed = time.monotonic() - start
+        replies = thread.handler.replies_applied - replies
+        busy_cpu = time.process_time() - cpu - idle_cpu_rate * elapsed
+        polling = {"duration_s": elapsed, "replies": replies, "polls_per_s": replies / elapsed,
+                   "cpu_per_poll_us": max(busy_cpu, 0.0) / max(replies, 1) * 1e6,
+                   "memory_growth_bytes": resident_memory() - memory}
+
+        #closed loop GetStat7 on top of the polling
+        latencies = []
+        failures = [0]
+        done = threading.Event()
+
+        def submit():
+            sent = time.perf_counter()
+            future = thread.execute_command("GetStat7", timeout=1.0)
+            future.add_done_callback(lambda f: finished(f, sent))
+
+        def finished(future, sent):
+            if future.exception() is None:
+                latencies.append(time.perf_counter() - sent)
+            else:
+                failures[0] += 1
+            if not done.is_set():
+                submit()
+
+        submit()
+        pump(duration)
+        done.set()
+        latency = {"commands": len(latencies), "failures": failures[0],
+                   "commands_per_s": len(latencies) / duration}
+        if latencies:
+            latency.update(("p{:g}_ms".format(f * 100), percentile(latencies, f) * 1e3) for f in (0.5, 0.9, 0.99))
+
+        thread.alive = False
+        thread.wait()
+        return {"polling": polling, "latency": latency}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BASE_DIRECTORY,
+                                       stderr=subprocess.DEVNULL).decode("ASCII").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per end-to-end phase")
+    parser.add_argument("--repetitions", type=int, default=20000, help="calls per microbenchmark run")
+    parser.add_argument("--micro-only", action="store_true", help="skip the end-to-end benchmarks")
+    arguments = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": git_revision(),
+               "python": platform.python_version(), "platform": platform.platform(),
+               "micro": micro_benchmarks(arguments.repetitions), "import_time": import_times()}
+    if not arguments.micro_only:
+        if hasattr(os, "openpty"):
+            results["end_to_end"] = end_to_end_benchmarks(arguments.duration)
+        else:
+            logging.error("End-to-end benchmarks need a pseudo terminal, skipped")
+
+    text = json.dumps(results, indent=1, sort_keys=True)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:40:12 2026
+
+@author: Alexander Marsteller
+
+asyncio client for the laser, without Qt and without threads:
+
+    laser = await open_laser("/dev/ttyUSB0")
+    await laser.laser_on()
+    await laser.open_shutter()
+    status = await laser.stat7()
+    await laser.close()
+
+AsyncSerialTransport lets the event loop watch the file descriptor of a
+pyserial port (loop.add_reader) and falls back to polling the port from a
+task where the loop can't watch it, e.g. the proactor loop on Windows.
+AsyncLaser matches replies to the commands awaiting them the same way
+SerialLink does, applies them to a LaserCommunicationHandler and passes
+them on to subscribers.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+import serial
+import serial.tools.list_ports
+
+from laser_protocol import ReplyFramer, LaserProtocolError, Capabilities
+from laser_handler import LaserCommunicationHandler
+from laser_transport import (Acknowledgement, CommandTimeoutError, SetpointNotAppliedError, LinkClosedError,
+                             LinkLostError, UnsupportedCommandError, PollScheduler)
+from laser_ports import open_port, SERIAL_SETTINGS, SHORT_STATUS_REPLY
+from laser_cache import CapabilityCache, PortIdentityCache
+
+
+class AsyncSerialTransport(object):
+    """
+    Non-blocking I/O on an open pyserial connection from the running event
+    loop. Everything received is passed to ``on_data(data)``; if the port
+    fails ``on_error(exception)`` is called once and the transport stops
+    reading. Frames to the laser are a few bytes, write() hands them to the
+    driver right away.
+    """
+
+    def __init__(self, serial_connection, on_data, on_error=None, poll_interval=0.005):
+        self.serial_connection = serial_connection
+        self.on_data = on_data
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self.loop = asyncio.get_running_loop()
+        self.failed = None
+        self._fd = None
+        self._poll_task = None
+        serial_connection.timeout = 0
+        try:
+            fd = serial_connection.fileno()
+            self.loop.add_reader(fd, self._readable)
+            self._fd = fd
+        except (AttributeError, NotImplementedError, ValueError, OSError):
+            self._poll_task = self.loop.create_task(self._poll())
+
+    def _readable(self):
+        try:
+            data = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+        except (OSError, ValueError) as e:
+            self._failed(e)
+            return
+        if data:
+            self.on_data(data)
+
+    async def _poll(self):
+        while self.failed is None:
+            self._readable()
+            await asyncio.sleep(self.poll_interval)
+
+    def _failed(self, error):
+        if self.failed is not None:
+            return
+        self.failed = error
+        self.detach()
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def write(self, data):
+        if self.failed is not None:
+            raise LinkLostError("Connection to the laser is lost: {}".format(self.failed))
+        try:
+            self.serial_connection.write(data)
+        except (OSError, ValueError) as e:
+            self._failed(e)
+            raise LinkLostError("Writing to the laser failed: {}".format(e))
+
+    def detach(self):
+        """ Stop reading, the connection stays open. """
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    def close(self):
+        self.detach()
+        try:
+            #commands written last must leave the port before it is closed
+            if self.failed is None:
+                self.serial_connection.flush()
+            self.serial_connection.close()
+        except (OSError, ValueError):
+            pass
+
+
+class AsyncLaser(object):
+    """
+    Awaitable commands and queries on an open serial connection. Create it
+    inside the running event loop, usually through open_laser().
+
+    execute() returns the decoded reply record for queries and an
+    Acknowledgement for commands without reply, and raises the errors of
+    laser_transport (CommandTimeoutError, SetpointNotAppliedError,
+    UnsupportedCommandError, LinkLostError, LinkClosedError). At most
+    ``max_in_flight`` queries wait for their replies at the same time, any
+    number of coroutines can await commands concurrently.
+
+    All frames go out through one send queue, first in, first out, paced
+    at the line rate of ``baud_rate`` like the writer of SerialLink, so a
+    frame counts as sent once it is on the line. Timeouts start from
+    there, not from queueing, and commands without reply resolve then.
+
+    ``subscribe(callback)`` registers ``callback(frame, response_type,
+    record)`` for every decoded reply. start_polling() keeps the handler up
+    to date with the adaptive PollScheduler of the Qt thread. A failed port
+    is not reopened; pending and later commands raise LinkLostError.
+    """
+
+    def __init__(self, serial_connection, handler=None, max_in_flight=3, capability_cache=None,
+                 readback_interval=0.05, baud_rate=9600, bits_per_byte=10):
+        self.handler = handler if handler is not None else LaserCommunicationHandler()
+        self.capability_cache = capability_cache if capability_cache is not None else CapabilityCache()
+        self.readback_interval = readback_interval
+        #seconds one byte takes on the line
+        self.byte_time = bits_per_byte / float(baud_rate)
+        self.poller = PollScheduler(self.handler.query_frame_lengths(), baud_rate=baud_rate)
+        self.framer = ReplyFramer()
+        self.decode_errors = 0
+        self.closed = False
+        self.port = None
+        self.laser_serial_number = None
+        self._loop = asyncio.get_running_loop()
+        self._in_flight = {}
+        self._window = asyncio.Semaphore(max_in_flight)
+        self._subscribers = []
+        self._tasks = set()
+        self._poll_task = None
+        self._poll_wakeup = asyncio.Event()
+        self._outgoing = deque()
+        self._outgoing_ready = asyncio.Event()
+        self.transport = AsyncSerialTransport(serial_connection, self._data_received, self._connection_failed)
+        self._send_task = self._loop.create_task(self._send_frames())
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _data_received(self, data):
+        for frame in self.framer.feed(data):
+            self._reply_received(bytes(frame))
+
+    def _reply_received(self, message):
+        try:
+            response_type, record = self.handler.decode_reply(message)
+        except LaserProtocolError as e:
+            self.decode_errors += 1
+            logging.critical("Discarding reply: {}".format(e))
+            return
+        self.handler.apply_reply(response_type, record)
+        queue = self._in_flight.get(response_type)
+        while queue:
+            future = queue.popleft()
+            if not future.done():
+                future.set_result(record)
+                break
+        if self.poller.observe(response_type, record, len(message)):
+            self._poll_wakeup.set()
+        for callback in list(self._subscribers):
+            callback(message, response_type, record)
+
+    def _connection_failed(self, error):
+        logging.critical("Connection to the laser lost: {}".format(error))
+        self._fail_pending(LinkLostError("Connection to the laser lost: {}".format(error)))
+
+    def _fail_pending(self, exception):
+        while self._outgoing:
+            frame, sent = self._outgoing.popleft()
+            if not sent.done():
+                sent.set_exception(exception)
+        for queue in self._in_flight.values():
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_exception(exception)
+
+    async def execute(self, command_string, command_parameter=None, timeout=1.0, retries=0, confirm=False):
+        """
+        Send a command and wait for its outcome. With confirm=True setpoints
+        are read back until the laser reports the new value (see
+        SETPOINT_READBACKS); ``retries`` then counts resends of the command.
+        """
+        if self.closed:
+            raise LinkClosedError("Link is closed")
+        if not self.handler.supports(command_string):
+            raise UnsupportedCommandError("The laser does not support {}".format(command_string))
+        frame = self.handler.encode_command(command_string, command_parameter)
+        reply_type = self.handler.reply_type_for(command_string)
+        if reply_type is not None:
+            return await self._query(command_string, frame, reply_type, timeout, retries)
+        if not confirm:
+            await self._send(frame)
+            return Acknowledgement(command_string, time.time())
+
+        query, query_frame, applied = self.handler.readback_for(command_string, command_parameter)
+        for attempt in range(retries + 1):
+            await self._send(frame)
+            deadline = self._loop.time() + timeout
+            while True:
+                try:
+                    record = await self._query(query, query_frame, query, timeout)
+                except CommandTimeoutError:
+                    record = None
+                if record is not None and applied(record):
+                    return record
+                if self._loop.time() >= deadline:
+                    break
+                await asyncio.sleep(self.readback_interval)
+        raise SetpointNotAppliedError("{} was not applied".format(command_string))
+
+    async def _query(self, command_string, frame, reply_type, timeout, retries=0):
+        for attempt in range(retries + 1):
+            async with self._window:
+                if self.closed:
+                    raise LinkClosedError("Link is closed")
+                future = self._loop.create_future()
+                queue = self._in_flight.setdefault(reply_type, deque())
+                queue.append(future)
+                try:
+                    await self._send(frame)
+                    return await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    logging.debug("No reply to %s", command_string)
+                finally:
+                    if future in queue:
+                        queue.remove(future)
+        raise CommandTimeoutError("No reply to {}".format(command_string))
+
+    async def _send(self, frame):
+        """ Queue ``frame`` and return once it is on the line. """
+        if self.closed:
+            raise LinkClosedError("Link is closed")
+        sent = self._loop.create_future()
+        self._outgoing.append((frame, sent))
+        self._outgoing_ready.set()
+        await sent
+
+    async def _send_frames(self):
+        while True:
+            while not self._outgoing:
+                self._outgoing_ready.clear()
+                await self._outgoing_ready.wait()
+            frame, sent = self._outgoing.popleft()
+            if sent.done():
+                #the caller gave up waiting
+                continue
+            try:
+                self.transport.write(frame)
+            except LinkLostError as e:
+                sent.set_exception(e)
+                continue
+            #the next frame waits until this one has left the port
+            await asyncio.sleep(len(frame) * self.byte_time)
+            if not sent.done():
+                sent.set_result(None)
+
+    def _spawn(self, coroutine):
+        task = self._loop.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.debug("Background command failed: %s", task.exception())
+
+    def start_polling(self):
+        if self._poll_task is None:
+            self._poll_task = self._loop.create_task(self._poll())
+
+    def stop_polling(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    async def _poll(self):
+        while not self.closed:
+            commands, next_due = self.poller.due(time.monotonic())
+            for command in commands:
+                self._spawn(self.execute(command))
+            self._poll_wakeup.clear()
+            delay = None if next_due is None else max(0.0, next_due - time.monotonic())
+            try:
+                await asyncio.wait_for(self._poll_wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def discover_capabilities(self):
+        """
+        Ask the laser for its serial number and look its options up in the
+        capability cache; only unknown lasers are asked for GetVer3.
+        Returns the Capabilities, or None if the laser did not tell.
+        """
+        try:
+            self.laser_serial_number = (await self.execute("GetAttenuatorStatus", retries=1)).laser_serial_number
+            capabilities = self.capability_cache.lookup(self.laser_serial_number)
+        except CommandTimeoutError:
+            capabilities = None
+        if capabilities is None:
+            try:
+                release_byte = (await self.execute("GetVer3", retries=1)).release_byte
+            except CommandTimeoutError as e:
+                logging.warning("Could not determine laser capabilities: {}".format(e))
+                return None
+            if self.laser_serial_number is not None:
+                self.capability_cache.store(self.laser_serial_number, release_byte)
+            capabilities = Capabilities.from_release_byte(release_byte)
+        logging.info("Laser capabilities: {}".format(capabilities))
+        self.handler.set_capabilities(capabilities)
+        for command in self.handler.unsupported_commands:
+            self.poller.remove(command)
+        return capabilities
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.stop_polling()
+        for task in list(self._tasks):
+            task.cancel()
+        self._send_task.cancel()
+        self._fail_pending(LinkClosedError("Link closed"))
+        self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def laser_on(self):
+        return await self.execute("LaserOn")
+
+    async def laser_off(self):
+        return await self.execute("LaserOff")
+
+    async def open_shutter(self, confirm=False):
+        return await self.execute("SetShutter", 1, confirm=confirm)
+
+    async def close_shutter(self, confirm=False):
+        return await self.execute("SetShutter", 0, confirm=confirm)
+
+    async def repetition_on(self):
+        return await self.execute("RepetitionOn")
+
+    async def burst_on(self):
+        return await self.execute("BurstOn")
+
+    async def external_trigger_on(self):
+        return await self.execute("ExtTrigmode")
+
+    async def stop(self):
+        return await self.execute("LaserStop")
+
+    async def set_repetition_rate(self, frequency, confirm=False):
+        return await self.execute("SetRepetitionFrequency", frequency, confirm=confirm)
+
+    async def set_repetition_quantity(self, quantity, confirm=False):
+        return await self.execute("SetBurstQuantity", quantity, confirm=confirm)
+
+    async def set_hv(self, hv, confirm=False):
+        return await self.execute("SetHV", hv, confirm=confirm)
+
+    async def set_transmission(self, transmission, confirm=False):
+        return await self.execute("SetTransmission", transmission, confirm=confirm)
+
+    async def set_stepper_position(self, position, confirm=False):
+        return await self.execute("SetStepperPosition", position, confirm=confirm)
+
+    async def set_attenuation_energy(self, energy):
+        return await self.execute("SetAttenuationEnergy", energy)
+
+    async def init_attenuator(self):
+        return await self.execute("InitAttenuator")
+
+    async def short_status(self):
+        return await self.execute("GetShortStatus")
+
+    async def stat7(self):
+        return await self.execute("GetStat7")
+
+    async def stat8(self):
+        return await self.execute("GetStat8")
+
+    async def version(self):
+        return await self.execute("GetVer3")
+
+    async def sernum(self):
+        return await self.execute("GetSernum")
+
+    async def attenuator_status(self):
+        return await self.execute("GetAttenuatorStatus")
+
+    async def energy_values(self):
+        return await self.execute("GetEnergyValues")
+
+
+async def probe_port_async(device, settings, handshake, deadline=0.5):
+    """
+    probe_port on the event loop: open ``device``, send ``handshake`` and
+    wait up to ``deadline`` seconds for a short status reply. Returns the
+    open connection or None.
+    """
+    loop = asyncio.get_running_loop()
+    connection = open_port(device, dict(settings, timeout=0))
+    framer = ReplyFramer()
+    answered = loop.create_future()
+
+    def received(data):
+        for frame in framer.feed(data):
+            if bytes(frame[:len(SHORT_STATUS_REPLY)]) == SHORT_STATUS_REPLY and not answered.done():
+                answered.set_result(True)
+
+    def failed(error):
+        if not answered.done():
+            answered.set_result(False)
+
+    transport = AsyncSerialTransport(connection, received, failed)
+    try:
+        connection.reset_input_buffer()
+        transport.write(handshake)
+        found = await asyncio.wait_for(answered, deadline)
+    except asyncio.TimeoutError:
+        found = False
+    except BaseException:
+        transport.close()
+        raise
+    if not found:
+        transport.close()
+        return None
+    transport.detach()
+    connection.timeout = settings.get("timeout")
+    return connection
+
+
+async def detect_laser_async(devices, settings, handshake, deadline=0.5):
+    """
+    detect_laser on the event loop: probe all ``devices`` concurrently, the
+    first one answering wins. Returns (device, open connection) or None.
+    """
+    probes = dict((asyncio.ensure_future(probe_port_async(device, settings, handshake, deadline)), device)
+                  for device in devices)
+    found = None
+    pending = set(probes)
+    try:
+        while pending and found is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for probe in done:
+                device = probes[probe]
+                if probe.exception() is not None:
+                    logging.info("Could not probe COM port {}: {}".format(device, probe.exception()))
+                elif probe.result() is not None:
+                    if found is None:
+                        found = (device, probe.result())
+                        logging.info("Laser found on COM port: {}".format(device))
+                    else:
+                        probe.result().close()
+    finally:
+        for probe in pending:
+            probe.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if result is not None and not isinstance(result, BaseException):
+                result.close()
+    return found
+
+
+async def open_laser(port=None, settings=SERIAL_SETTINGS, deadline=0.5, port_cache=None, discover=True,
+                     poll=False, **kwargs):
+    """
+    Connect to the laser and return an AsyncLaser. Without ``port`` the
+    ports the laser was connected to before are probed first (see
+    PortIdentityCache), then all ports. ``discover`` asks the laser for its
+    capabilities, ``poll`` starts status polling. Further keyword arguments
+    go to AsyncLaser. Raises serial.SerialException if no laser is found.
+    """
+    port_cache = port_cache if port_cache is not None else PortIdentityCache()
+    handshake = LaserCommunicationHandler().encode_command("GetShortStatus")
+    ports = list(serial.tools.list_ports.comports())
+    if port is not None:
+        connection = open_port(port, settings)
+    else:
+        known = port_cache.candidates(ports)
+        found = await detect_laser_async(known, settings, handshake, deadline) if known else None
+        if found is None:
+            found = await detect_laser_async([p.device for p in ports if p.device not in known],
+                                             settings, handshake, deadline)
+        if found is None:
+            raise serial.SerialException("Laser not found over serial interface")
+        port, connection = found
+
+    kwargs.setdefault("baud_rate", settings.get("baudrate", 9600))
+    laser = AsyncLaser(connection, **kwargs)
+    laser.port = port
+    if discover:
+        await laser.discover_capabilities()
+        if laser.laser_serial_number is not None:
+            port_info = None
+            for listed in ports:
+                if listed.device == port:
+                    port_info = listed
+            port_cache.store(laser.laser_serial_number, port, port_info)
+    if poll:
+        laser.start_polling()
+    return laser
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:30:52 2026
+
+@author: Alexander Marsteller
+
+Small persistent caches that survive restarts of the control software.
+"""
+
+import os
+import json
+import time
+import logging
+
+from laser_protocol import Capabilities
+
+
+CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".laser_control")
+
+
+class JsonCache(object):
+    """
+    Key/value store kept in a JSON file. The file is read on first use and
+    rewritten atomically on every change; a missing or broken file just
+    means an empty cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as cache_file:
+                    self._entries = json.load(cache_file)
+            except (IOError, OSError, ValueError) as e:
+                if os.path.exists(self.path):
+                    logging.warning("Ignoring unreadable cache {}: {}".format(self.path, e))
+                self._entries = {}
+        return self._entries
+
+    def get(self, key, default=None):
+        return self._load().get(str(key), default)
+
+    def put(self, key, value):
+        entries = self._load()
+        entries[str(key)] = value
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            temporary_path = self.path + ".tmp"
+            with open(temporary_path, "w") as cache_file:
+                json.dump(entries, cache_file, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.path)
+        except (IOError, OSError) as e:
+            logging.warning("Could not write cache {}: {}".format(self.path, e))
+
+
+class CapabilityCache(JsonCache):
+    """ Release bytes reported by GetVer3, stored per laser serial number. """
+
+    def __init__(self, path=os.path.join(CACHE_DIRECTORY, "capabilities.json")):
+        JsonCache.__init__(self, path)
+
+    def lookup(self, laser_serial_number):
+        release_byte = self.get(laser_serial_number)
+        if release_byte is None:
+            return None
+        return Capabilities.from_release_byte(release_byte)
+
+    def store(self, laser_serial_number, release_byte):
+        self.put(laser_serial_number, release_byte)
+
+
+class PortIdentityCache(JsonCache):
+    """
+    USB identity (vendor id, product id, serial number) and device name of
+    the port each laser was last connected to, stored per laser serial
+    number. Device names change between boots, the USB identity does not.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIRECTORY, "ports.json")):
+        JsonCache.__init__(self, path)
+
+    def store(self, laser_serial_number, device, port_info=None):
+        """ ``port_info`` is the serial.tools.list_ports entry of ``device``, if listed. """
+        self.put(laser_serial_number, {"device": device,
+                                       "vid": getattr(port_info, "vid", None),
+                                       "pid": getattr(port_info, "pid", None),
+                                       "serial_number": getattr(port_info, "serial_number", None),
+                                       "used": time.time()})
+
+    def candidates(self, ports):
+        """
+        Devices of the listed ``ports`` a known laser was connected to, most
+        recently used first. Ports are matched by USB identity; by device
+        name only where the adapter has no serial number of its own.
+        """
+        entries = sorted(self._load().values(), key=lambda entry: entry.get("used", 0), reverse=True)
+        devices = []
+        for entry in entries:
+            for port in ports:
+                if entry.get("serial_number") is not None:
+                    matches = (port.vid, port.pid, port.serial_number) == \
+                        (entry.get("vid"), entry.get("pid"), entry["serial_number"])
+                else:
+                    matches = port.device == entry.get("device") and port.vid == entry.get("vid") \
+                        and port.pid == entry.get("pid")
+                if matches and port.device not in devices:
+                    devices.append(port.device)
+        return devices
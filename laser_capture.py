@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:44 2026
+
+@author: Alexander Marsteller
+
+Binary captures of the serial traffic to and from the laser, and replay of
+captures through LaserCommunicationHandler.
+
+A capture file starts with a 16 byte header (magic, format version, wall
+clock time at the start of the capture in ns) followed by one record per
+chunk of bytes seen on the line:
+
+    int64   nanoseconds since the start of the capture (monotonic)
+    uint8   direction, TO_LASER or FROM_LASER
+    uint16  length of the data
+    bytes   data
+
+All numbers are little endian.
+"""
+
+import re
+import time
+import struct
+import logging
+import threading
+from collections import namedtuple, Counter
+
+from laser_protocol import ReplyFramer, LaserProtocolError
+
+
+CAPTURE_MAGIC = b"MNLCAP"
+CAPTURE_VERSION = 1
+TO_LASER = 0
+FROM_LASER = 1
+
+_HEADER = struct.Struct("<6sHq")
+_RECORD = struct.Struct("<qBH")
+
+CaptureRecord = namedtuple("CaptureRecord", "timestamp direction data")
+ReplayResult = namedtuple("ReplayResult", "frames replies errors bad_frames discarded_bytes elapsed")
+
+
+class CaptureFormatError(IOError):
+    pass
+
+
+class CaptureWriter(object):
+    """
+    Writes capture records to ``path``; usable as a context manager. Safe
+    to share between the reader and writer thread.
+    """
+
+    def __init__(self, path, start_time=None):
+        self.path = path
+        self._file = open(path, "wb")
+        self._start = time.monotonic_ns()
+        self.start_time = time.time_ns() if start_time is None else start_time
+        self._file.write(_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, self.start_time))
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def write(self, direction, data, timestamp=None):
+        """ Add ``data``; ``timestamp`` is ns since start, default now. """
+        if timestamp is None:
+            timestamp = time.monotonic_ns() - self._start
+        data = bytes(data)
+        with self._lock:
+            for offset in range(0, max(len(data), 1), 0xFFFF):
+                chunk = data[offset:offset + 0xFFFF]
+                self._file.write(_RECORD.pack(timestamp, direction, len(chunk)))
+                self._file.write(chunk)
+                self.records += 1
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_capture(path):
+    """ Yield the CaptureRecords of a capture file in order. """
+    with open(path, "rb") as capture_file:
+        header = capture_file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise CaptureFormatError("{} is too short for a capture".format(path))
+        magic, version, start_time = _HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise CaptureFormatError("{} is not a version {} capture".format(path, CAPTURE_VERSION))
+        while True:
+            record_header = capture_file.read(_RECORD.size)
+            if not record_header:
+                return
+            if len(record_header) < _RECORD.size:
+                raise CaptureFormatError("Truncated record in {}".format(path))
+            timestamp, direction, length = _RECORD.unpack(record_header)
+            data = capture_file.read(length)
+            if len(data) < length:
+                raise CaptureFormatError("Truncated record in {}".format(path))
+            yield CaptureRecord(timestamp, direction, data)
+
+
+class CapturingSerial(object):
+    """
+    Wraps an open serial connection and writes everything sent and received
+    through it to a CaptureWriter. Everything else is passed through.
+    Closing it leaves the writer open, so a reopened connection can be
+    wrapped with the same writer.
+    """
+
+    def __init__(self, serial_connection, writer):
+        self.serial_connection = serial_connection
+        self.writer = writer
+
+    def write(self, data):
+        self.writer.write(TO_LASER, data)
+        return self.serial_connection.write(data)
+
+    def read(self, size=1):
+        data = self.serial_connection.read(size)
+        if data:
+            self.writer.write(FROM_LASER, data)
+        return data
+
+    def read_until(self, *args, **kwargs):
+        data = self.serial_connection.read_until(*args, **kwargs)
+        if data:
+            self.writer.write(FROM_LASER, data)
+        return data
+
+    def close(self):
+        self.serial_connection.close()
+
+    def __getattr__(self, name):
+        return getattr(self.serial_connection, name)
+
+
+def import_communications_log(log_path, capture_path, baud_rate=9600, reply_latency=0.005,
+                              command_gap=0.1, bits_per_byte=10):
+    """
+    Convert a text log of "Sending command:" / "Recieved Reply:" pairs (as
+    in communications_log.txt) to a capture. The text log carries no
+    times, so they are reconstructed: each frame takes its transmission
+    time at ``baud_rate``, replies follow after ``reply_latency`` and the
+    next command ``command_gap`` seconds after the previous one started.
+    Returns the number of exchanges imported.
+    """
+    with open(log_path) as log_file:
+        text = log_file.read()
+    exchanges = re.findall(r"Sending command:\n(.*)\nRecieved Reply:\n(.*)\n", text)
+
+    byte_time = int(1e9 * bits_per_byte / baud_rate)
+    with CaptureWriter(capture_path) as writer:
+        for number, (command, reply) in enumerate(exchanges):
+            sent = int(number * command_gap * 1e9)
+            frame = command.strip().encode("ASCII") + b"\r"
+            writer.write(TO_LASER, frame, sent)
+            reply = reply.strip()
+            if reply:
+                received = sent + byte_time * (len(frame) + len(reply) + 1) + int(reply_latency * 1e9)
+                writer.write(FROM_LASER, reply.encode("ASCII") + b"\r", received)
+    return len(exchanges)
+
+
+def replay(records, handler, speed=None):
+    """
+    Feed the received bytes of a capture through ``handler`` (a
+    LaserCommunicationHandler) as the reader thread would.
+
+    ``speed`` None replays as fast as possible, otherwise the records are
+    delivered on the recorded schedule scaled by ``speed`` (1.0 = real
+    time). Frames are decoded and applied to the handler; frames it can't
+    decode are counted, not raised. ``records`` is an iterable of
+    CaptureRecords, e.g. read_capture(path).
+    """
+    framer = ReplyFramer()
+    replies = Counter()
+    errors = 0
+    frames = 0
+    first = None
+    start = time.perf_counter()
+    for record in records:
+        if record.direction != FROM_LASER:
+            continue
+        if speed is not None:
+            if first is None:
+                first = record.timestamp
+            delay = (record.timestamp - first) / 1e9 / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        for frame in framer.feed(record.data):
+            frames += 1
+            try:
+                response_type, result = handler.decode_reply(frame)
+            except LaserProtocolError as e:
+                errors += 1
+                logging.debug("Replay could not decode %r: %s", bytes(frame), e)
+                continue
+            handler.apply_reply(response_type, result)
+            replies[response_type] += 1
+    elapsed = time.perf_counter() - start
+    return ReplayResult(frames, replies, errors, framer.bad_frames, framer.discarded_bytes, elapsed)
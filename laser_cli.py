@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:10:26 2026
+
+@author: Alexander Marsteller
+
+Command line control of the laser, without Qt. Runs on the asyncio client
+(laser_async), so a command sequence costs one connection and no threads.
+
+Commands are given as arguments or read from a script file (one or more
+commands per line, # starts a comment) and run in order:
+
+    python laser_cli.py laser-on shutter open frequency 10 repetition-on
+    python laser_cli.py --script warm_up.txt
+    python laser_cli.py --rate 5 monitor 60 > status.jsonl
+
+Commands (the protocol names, e.g. LaserOn or SetHV 50, work as well):
+
+    laser-on, laser-off, standby    switch the laser on / off
+    repetition-on, burst-on         start firing continuously / a burst
+    ext-trig                        fire on the external trigger
+    stop                            stop firing
+    shutter open|close
+    frequency HZ, quantity N        repetition rate and burst length
+    hv PERCENT, hv-up, hv-down      high voltage
+    transmission N, stepper N       attenuator position
+    attenuation-energy N, init-attenuator
+    status                          print one status line
+    monitor SECONDS                 print status lines at --rate for SECONDS
+    wait SECONDS                    pause
+
+Status lines are JSON objects with the time and the decoded reply of every
+query in --queries. The exit status tells what went wrong:
+
+    0  all commands done
+    2  invalid command line or script
+    3  laser not found or port could not be opened
+    4  the laser did not answer in time
+    5  a setpoint was not applied (--confirm)
+    6  the laser does not support a command
+    7  connection to the laser lost
+    130 interrupted
+"""
+
+import sys
+import time
+import json
+import shlex
+import asyncio
+import logging
+import argparse
+
+import serial
+
+from laser_handler import LaserCommunicationHandler
+from laser_protocol import SETPOINT_READBACKS
+from laser_transport import (CommandTimeoutError, SetpointNotAppliedError, UnsupportedCommandError,
+                             LinkLostError, LinkClosedError)
+
+
+EXIT_OK = 0
+EXIT_USAGE = 2
+EXIT_NOT_FOUND = 3
+EXIT_TIMEOUT = 4
+EXIT_NOT_APPLIED = 5
+EXIT_UNSUPPORTED = 6
+EXIT_CONNECTION_LOST = 7
+EXIT_INTERRUPTED = 130
+
+# command line name: (protocol command, parameter) where parameter is None,
+# a converter for one argument or a dictionary of allowed words
+COMMANDS = {
+    "laser-on": ("LaserOn", None),
+    "standby": ("LaserOn", None),
+    "laser-off": ("LaserOff", None),
+    "repetition-on": ("RepetitionOn", None),
+    "burst-on": ("BurstOn", None),
+    "ext-trig": ("ExtTrigmode", None),
+    "stop": ("LaserStop", None),
+    "shutter": ("SetShutter", {"open": 1, "close": 0}),
+    "frequency": ("SetRepetitionFrequency", int),
+    "quantity": ("SetBurstQuantity", int),
+    "hv": ("SetHV", int),
+    "hv-up": ("IncrementHV", None),
+    "hv-down": ("DecrementHV", None),
+    "transmission": ("SetTransmission", int),
+    "stepper": ("SetStepperPosition", int),
+    "attenuation-energy": ("SetAttenuationEnergy", int),
+    "init-attenuator": ("InitAttenuator", None),
+}
+
+# commands of the tool itself: name: converter of the argument or None
+LOCAL_COMMANDS = {"status": None, "monitor": float, "wait": float}
+
+DEFAULT_QUERIES = ("GetShortStatus", "GetStat7", "GetStat8")
+
+EXIT_CODES = ((CommandTimeoutError, EXIT_TIMEOUT), (SetpointNotAppliedError, EXIT_NOT_APPLIED),
+              (UnsupportedCommandError, EXIT_UNSUPPORTED), (LinkLostError, EXIT_CONNECTION_LOST),
+              (LinkClosedError, EXIT_CONNECTION_LOST), (serial.SerialException, EXIT_NOT_FOUND),
+              (OSError, EXIT_NOT_FOUND))
+
+
+class CommandLineError(ValueError):
+    pass
+
+
+class Step(object):
+    """ One parsed command; ``command`` is a protocol or LOCAL_COMMANDS name. """
+    __slots__ = ("command", "parameter", "source")
+
+    def __init__(self, command, parameter=None, source=""):
+        self.command = command
+        self.parameter = parameter
+        self.source = source
+
+
+def parse_commands(tokens, handler, source=""):
+    """ Turn command words into Steps, checking names and parameters. """
+    steps = []
+    tokens = list(tokens)
+    position = 0
+    while position < len(tokens):
+        word = tokens[position]
+        position += 1
+        if word in LOCAL_COMMANDS:
+            command, converter = word, LOCAL_COMMANDS[word]
+        elif word.lower() in COMMANDS:
+            command, converter = COMMANDS[word.lower()]
+        elif word in handler.command_dictionary:
+            command = word
+            converter = int if handler.command_parameter_dictionary.get(word) is not None else None
+        else:
+            raise CommandLineError("{}unknown command {!r}".format(source, word))
+
+        parameter = None
+        if converter is not None:
+            if position == len(tokens):
+                raise CommandLineError("{}{} needs a value".format(source, word))
+            value = tokens[position]
+            position += 1
+            try:
+                parameter = converter[value.lower()] if isinstance(converter, dict) else converter(value)
+            except (KeyError, ValueError):
+                raise CommandLineError("{}invalid value {!r} for {}".format(source, value, word))
+        if command not in LOCAL_COMMANDS:
+            try:
+                handler.command_encoder.encode(command, parameter)
+            except ValueError as e:
+                raise CommandLineError("{}{} {}: {}".format(source, word, parameter, e))
+        steps.append(Step(command, parameter, source))
+    return steps
+
+
+def parse_script(lines, handler, name="script"):
+    steps = []
+    for number, line in enumerate(lines, 1):
+        try:
+            tokens = shlex.split(line, comments=True)
+        except ValueError as e:
+            raise CommandLineError("{}:{}: {}".format(name, number, e))
+        steps.extend(parse_commands(tokens, handler, "{}:{}: ".format(name, number)))
+    return steps
+
+
+def _json_value(value):
+    tolist = getattr(value, "tolist", None)
+    if tolist is not None:
+        return tolist()
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+class StatusPrinter(object):
+    """ Queries the laser and writes one JSON line per status to ``output``. """
+
+    def __init__(self, laser, queries=DEFAULT_QUERIES, output=sys.stdout, timeout=1.0):
+        self.laser = laser
+        self.queries = queries
+        self.output = output
+        self.timeout = timeout
+
+    async def print_status(self):
+        queries = [q for q in self.queries if self.laser.handler.supports(q)]
+        #wait for all queries, so none is left failing unobserved when the link closes
+        records = await asyncio.gather(*[self.laser.execute(q, timeout=self.timeout) for q in queries],
+                                       return_exceptions=True)
+        for record in records:
+            if isinstance(record, BaseException):
+                raise record
+        line = {"time": round(time.time(), 3)}
+        for query, record in zip(queries, records):
+            line[query] = record._asdict()
+        self.output.write(json.dumps(line, default=_json_value) + "\n")
+        self.output.flush()
+
+    async def monitor(self, duration, rate):
+        """ Status lines every 1/``rate`` seconds for ``duration`` seconds; late lines are skipped. """
+        interval = 1.0 / rate
+        start = time.monotonic()
+        line = 0
+        while line * interval < duration:
+            await self.print_status()
+            elapsed = time.monotonic() - start
+            line = max(line + 1, int(elapsed / interval + 0.5))
+            if line * interval < duration:
+                await asyncio.sleep(max(0.0, line * interval - elapsed))
+
+
+async def run_steps(steps, arguments, output=sys.stdout):
+    """ Connect, run ``steps`` in order and return the exit status. """
+    from laser_async import open_laser
+    laser = await open_laser(arguments.port, deadline=arguments.probe_deadline,
+                             discover=not arguments.skip_discovery)
+    printer = StatusPrinter(laser, arguments.queries, output, arguments.timeout)
+    status = EXIT_OK
+    try:
+        for step in steps:
+            try:
+                await run_step(laser, printer, step, arguments)
+            except Exception as e:
+                code = exit_code(e)
+                if code is None:
+                    raise
+                logging.error("{}{}: {}".format(step.source, step.command, e))
+                if status == EXIT_OK:
+                    status = code
+                if not arguments.keep_going or code == EXIT_CONNECTION_LOST:
+                    break
+    finally:
+        await laser.close()
+    return status
+
+
+async def run_step(laser, printer, step, arguments):
+    if step.command == "status":
+        await printer.print_status()
+    elif step.command == "monitor":
+        await printer.monitor(step.parameter, arguments.rate)
+    elif step.command == "wait":
+        await asyncio.sleep(step.parameter)
+    else:
+        confirm = arguments.confirm and step.command in SETPOINT_READBACKS
+        await laser.execute(step.command, step.parameter, timeout=arguments.timeout,
+                            retries=arguments.retries, confirm=confirm)
+
+
+def exit_code(exception):
+    for exception_type, code in EXIT_CODES:
+        if isinstance(exception, exception_type):
+            return code
+    return None
+
+
+def argument_parser():
+    parser = argparse.ArgumentParser(description="Control the MNL 100 laser without a GUI.",
+                                     epilog=__doc__[__doc__.index("Commands ("):],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("commands", nargs="*", help="commands to run in order, see below")
+    parser.add_argument("--script", help="read commands from this file, - for stdin (after the arguments)")
+    parser.add_argument("--port", help="serial port of the laser, detected if not given")
+    parser.add_argument("--rate", type=float, default=1.0, help="status lines per second of monitor")
+    parser.add_argument("--queries", type=lambda text: tuple(text.split(",")), default=DEFAULT_QUERIES,
+                        help="comma separated queries of a status line (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=1.0, help="seconds to wait for a reply")
+    parser.add_argument("--retries", type=int, default=1, help="resends of an unanswered command")
+    parser.add_argument("--confirm", action="store_true", help="read setpoints back until they are applied")
+    parser.add_argument("--keep-going", action="store_true", help="run the remaining commands after a failure")
+    parser.add_argument("--skip-discovery", action="store_true",
+                        help="do not ask the laser for its options before running the commands")
+    parser.add_argument("--probe-deadline", type=float, default=0.5,
+                        help="seconds every port gets to answer when detecting the laser")
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="log to stderr, twice for debug")
+    return parser
+
+
+def main(argv=None):
+    arguments = argument_parser().parse_args(argv)
+    logging.basicConfig(format="%(levelname)s %(message)s",
+                        level=(logging.ERROR, logging.INFO, logging.DEBUG)[min(arguments.verbose, 2)])
+    if arguments.rate <= 0:
+        logging.error("--rate has to be positive")
+        return EXIT_USAGE
+
+    handler = LaserCommunicationHandler()
+    unknown = [query for query in arguments.queries if handler.reply_type_for(query) is None]
+    if unknown:
+        logging.error("Unknown queries: {}".format(", ".join(unknown)))
+        return EXIT_USAGE
+
+    try:
+        steps = parse_commands(arguments.commands, handler)
+        if arguments.script == "-":
+            steps += parse_script(sys.stdin, handler, "stdin")
+        elif arguments.script is not None:
+            with open(arguments.script) as script_file:
+                steps += parse_script(script_file, handler, arguments.script)
+    except (CommandLineError, IOError) as e:
+        logging.error(e)
+        return EXIT_USAGE
+    if not steps:
+        logging.error("Nothing to do, give commands or --script")
+        return EXIT_USAGE
+
+    try:
+        return asyncio.run(run_steps(steps, arguments))
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        code = exit_code(e)
+        if code is None:
+            raise
+        logging.error(e)
+        return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
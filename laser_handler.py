@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:05:37 2026
+
+@author: Alexander Marsteller
+
+LaserCommunicationHandler, the protocol state of one laser: encodes
+commands, decodes replies and keeps the latest decoded record of every
+reply type. It does no I/O, so the Qt thread and the asyncio client share
+it.
+"""
+
+import logging
+
+from laser_protocol import (CommandEncoder, ReplyDispatcher, LaserStatus, REPLY_LAYOUTS, REPLY_FIELD_OWNERS,
+                            SETPOINT_READBACKS, BYTE_BITS, frame_check_sequence)
+
+class LaserCommunicationHandler(object):
+    
+    
+    def __init__(self, energy_value_limit=100000, energy_statistics_window=1000):
+        logging.debug("Initializing laser communitcation handler.")
+        #define variables
+        self.request_start_delimiter = "#"
+        self.response_start_delimiter = "<"
+        self.destination_address = "!"
+        self.source_address = "@"
+        self.end_delimiter = "\r"
+        
+        
+        self.command_dictionary =  {}
+        self.command_dictionary["LaserOff"] = "X"
+        self.command_dictionary["LaserOn"] = "g"
+        self.command_dictionary["RepetitionOn"] = "h"
+        self.command_dictionary["BurstOn"] = "j"
+        self.command_dictionary["ExtTrigmode"] = "u"
+        self.command_dictionary["LaserStop"] = "i"
+        self.command_dictionary["SetBurstQuantity"] = "l"
+        self.command_dictionary["SetRepetitionFrequency"] = "m"
+        self.command_dictionary["SetHV"] = "n"
+        self.command_dictionary["IncrementHV"] = "o1"
+        self.command_dictionary["DecrementHV"] = "o0"
+        self.command_dictionary["SetShutter"] = "z"
+        self.command_dictionary["SetStepperPosition"] = "O3"
+        self.command_dictionary["SetTransmission"] = "O4"
+        self.command_dictionary["SetAttenuationEnergy"] = "O5"
+        self.command_dictionary["InitAttenuator"] = "O60000"
+        
+        self.command_dictionary["GetShortStatus"] = "W"
+        self.command_dictionary["GetStat7"] = "UT"
+        self.command_dictionary["GetStat8"] = "UU"
+        self.command_dictionary["GetVer3"] = "V3"
+        self.command_dictionary["GetSernum"] = "US"
+        self.command_dictionary["GetAttenuatorStatus"] = "UV"
+        self.command_dictionary["GetEnergyValues"] = "P"
+        
+        
+        
+        
+        self.command_parameter_dictionary = {}
+        self.command_parameter_dictionary["LaserOff"] = None
+        self.command_parameter_dictionary["LaserOn"] = None
+        self.command_parameter_dictionary["RepetitionOn"] = None
+        self.command_parameter_dictionary["BurstOn"] = None
+        self.command_parameter_dictionary["ExtTrigmode"] = None
+        self.command_parameter_dictionary["LaserStop"] = None
+        self.command_parameter_dictionary["SetBurstQuantity"] = {"min":0, "max":9999, "length":4}
+        self.command_parameter_dictionary["SetRepetitionFrequency"] = {"min":0, "max":99, "length":2}
+        self.command_parameter_dictionary["SetHV"] = {"min":0, "max":100, "length":2}
+        self.command_parameter_dictionary["IncrementHV"] = None
+        self.command_parameter_dictionary["DecrementHV"] = None
+        self.command_parameter_dictionary["SetShutter"] = {"min":0, "max":1, "length":1}
+        self.command_parameter_dictionary["SetStepperPosition"] = {"min":0, "max":399, "length":4}
+        self.command_parameter_dictionary["SetTransmission"] = {"min":0, "max":200, "length":2}
+        self.command_parameter_dictionary["SetAttenuationEnergy"] = {"min":0, "max":9999, "length":4}
+        self.command_parameter_dictionary["InitAttenuator"] = None
+        
+        self.command_encoder = CommandEncoder(self.command_dictionary, self.command_parameter_dictionary)
+        
+        
+        self.reply_layouts = {}
+        self.reply_directory = {}
+        self.reply_dispatcher = ReplyDispatcher()
+        for layout in REPLY_LAYOUTS:
+            self.reply_layouts[layout.response_type] = layout
+            self.reply_directory[layout.prefix] = layout.response_type
+            self.reply_dispatcher.register(layout.prefix, layout.response_type, layout.decode)
+        
+        #most recent decoded record of every reply type, replaced as a whole
+        #by apply_reply so readers in other threads always see one snapshot
+        self.status = LaserStatus.initial()
+        #replies applied so far, also those repeating the previous snapshot
+        self.replies_applied = 0
+        
+        """
+        self.flag_bytes_1 = {0:"Shutter is Open", 2:"Laser is Ready for Operation", 3:"Laser Standby", 
+                      4:"LaserMode: Off", 5:"LaserMode: Repetition", 6:"LaserMode: Burst", 7:"LaserMode: External triggering"}
+        self.flag_bytes_3 = {0:"Service Mode activated", 5:"EEPROM error", 6:"Watchdog Reset occurred"}
+        
+        
+        self.flag_bytes_4 = {0:"Static error", 1:"Laser head chamber open", 2:"External interlock circuit open (Remote)", 
+                        3:"Temperature too high (> 60°C)", 4:"Temperature 1 too high (> 48°C) ",
+                        5:"Temperature 2 too high (> 48°C) warning", 6:"Energy monitor error occurred"}
+        
+        self.flag_bytes_5 = {0:"Operation error: Laser must be switched off", 3:"High voltage supply error or temperature error",
+                        4:"Temperature error 1", 5:"Temperature error 2", 6:"Power switch is damaged", 7:"Power supply is too weak"}
+        
+        self.release_bytes = {0:"Shutter control is not supported", 1:"Attenuation module is supported",
+                         3:"High voltage control is supported", 6:"Energy measuring is supported"}
+        """
+        
+        #newest pulse energies, bounded so long runs do not grow memory; both
+        #are created on first use, which is what loads NumPy
+        self.energy_value_limit = energy_value_limit
+        self.energy_statistics_window = energy_statistics_window
+        self._energy_values = None
+        self._energy_statistics = None
+        
+        #optional features of the connected laser, None until discovered
+        self.capabilities = None
+        self.unsupported_commands = frozenset()
+        
+    @property
+    def energy_values(self):
+        if self._energy_values is None:
+            from laser_telemetry import EnergyRing
+            self._energy_values = EnergyRing(self.energy_value_limit)
+        return self._energy_values
+        
+    @property
+    def energy_statistics(self):
+        if self._energy_statistics is None:
+            from laser_telemetry import EnergyStatistics
+            self._energy_statistics = EnergyStatistics(self.energy_statistics_window)
+        return self._energy_statistics
+        
+    def __getattr__(self, name):
+        #flat access to the fields of the latest replies, e.g. handler.shutter_open;
+        #reading handler.status once gives values of one consistent snapshot
+        if name not in REPLY_FIELD_OWNERS:
+            raise AttributeError(name)
+        return getattr(self.status, name)
+        
+    @property
+    def replies(self):
+        return dict((response_type, self.status.record(response_type)) for response_type in self.reply_layouts)
+        
+    def _calculate_frame_check_squence(self, telegram):
+        return frame_check_sequence(telegram.encode("ASCII")).decode("ASCII")
+        
+    
+    def compose_command(self, command_string, command_parameter=None):
+        return self.encode_command(command_string, command_parameter).decode("ASCII")
+        
+    
+    def encode_command(self, command_string, command_parameter=None):
+        try:
+            return self.command_encoder.encode(command_string, command_parameter)
+        except ValueError:
+            logging.critical("Incompatible command parameter supplied: %s", command_parameter)
+            raise
+        
+    
+    def compose_many(self, commands):
+        return self.command_encoder.compose_many(commands)
+        
+    
+    def _flag_byte_decoder(self, flag_byte):
+        return BYTE_BITS[flag_byte]
+        
+        
+    def _interprete_response(self, reply):
+        response_type, record = self.decode_reply(reply)
+        self.apply_reply(response_type, record)
+        return response_type
+        
+    def decode_reply(self, reply):
+        return self.reply_dispatcher.decode(reply)
+        
+    def apply_reply(self, response_type, record):
+        #publish the new snapshot with a single assignment and return it
+        status = self.status.updated(response_type, record)
+        self.status = status
+        self.replies_applied += 1
+        
+        if response_type == "GetEnergyValues":
+            self.energy_values.extend(record.energy_values)
+            self.energy_statistics.update(record.energy_values)
+        return status
+        
+    def query_frame_lengths(self, samples=10):
+        #request and expected reply bytes of every query, for the polling budget
+        return dict((name, (len(self.encode_command(name)), layout.frame_length(samples)))
+                    for name, layout in self.reply_layouts.items())
+        
+    def set_capabilities(self, capabilities):
+        self.capabilities = capabilities
+        self.unsupported_commands = frozenset(capabilities.unsupported_commands())
+        
+    def supports(self, command_string):
+        return command_string not in self.unsupported_commands
+        
+    def reply_type_for(self, command_string):
+        if command_string in self.reply_layouts:
+            return command_string
+        return None
+        
+    def readback_for(self, command_string, command_parameter=None):
+        try:
+            query, field, expected = SETPOINT_READBACKS[command_string]
+        except KeyError:
+            raise ValueError("{} can not be read back".format(command_string))
+        if expected is None:
+            expected = command_parameter
+        
+        def applied(record):
+            return getattr(record, field) == expected
+        
+        return query, self.encode_command(query), applied
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:34:58 2026
+
+@author: Alexander Marsteller
+
+Finding the serial port the laser is connected to.
+"""
+
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import serial
+
+from laser_protocol import ReplyFramer, REPLY_HEADER
+
+
+SHORT_STATUS_REPLY = REPLY_HEADER + b"W"
+
+# serial.Serial keyword arguments of the MNL 100 interface
+SERIAL_SETTINGS = {"baudrate": 9600, "parity": serial.PARITY_NONE, "bytesize": 8, "stopbits": 1,
+                   "rtscts": 1, "timeout": 0.2, "write_timeout": 5}
+
+
+def open_port(device, settings):
+    """ serial.Serial for ``device`` with ``settings`` (keyword arguments of serial.Serial). """
+    return serial.Serial(device, **settings)
+
+
+def probe_port(device, settings, handshake, deadline=0.5, cancelled=None, poll_timeout=0.02):
+    """
+    Open ``device``, send ``handshake`` (the GetShortStatus request, which
+    changes nothing on the laser) and wait up to ``deadline`` seconds for a
+    valid short status reply. Returns the open connection if the laser
+    answered, otherwise closes the port and returns None. The wait ends
+    early once ``cancelled`` (a threading.Event) is set.
+    """
+    connection = open_port(device, dict(settings, timeout=poll_timeout))
+    try:
+        connection.reset_input_buffer()
+        connection.write(handshake)
+        framer = ReplyFramer()
+        end = time.monotonic() + deadline
+        while time.monotonic() < end and not (cancelled is not None and cancelled.is_set()):
+            data = connection.read(connection.in_waiting or 1)
+            for frame in framer.feed(data):
+                if bytes(frame[:len(SHORT_STATUS_REPLY)]) == SHORT_STATUS_REPLY:
+                    connection.timeout = settings.get("timeout")
+                    return connection
+    except BaseException:
+        connection.close()
+        raise
+    connection.close()
+    return None
+
+
+def detect_laser(devices, settings, handshake, deadline=0.5, max_workers=16):
+    """
+    Probe all ``devices`` in parallel (see probe_port). The first port
+    whose device answers wins and the remaining probes are cancelled.
+    Returns (device, open connection) or None if no laser answered within
+    ``deadline``.
+    """
+    devices = list(devices)
+    if not devices:
+        return None
+    cancelled = threading.Event()
+    found = None
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(devices)))
+    try:
+        probes = dict((pool.submit(probe_port, device, settings, handshake, deadline, cancelled), device)
+                      for device in devices)
+        for probe in as_completed(probes):
+            device = probes[probe]
+            if probe.cancelled():
+                continue
+            try:
+                connection = probe.result()
+            except (serial.SerialException, OSError, ValueError) as e:
+                logging.info("Could not probe COM port {}: {}".format(device, e))
+                continue
+            if connection is None:
+                if found is None:
+                    logging.info("Nothing found on COM port: {}".format(device))
+            elif found is None:
+                found = (device, connection)
+                logging.info("Laser found on COM port: {}".format(device))
+                cancelled.set()
+                for other in probes:
+                    other.cancel()
+            else:
+                #answered at the same time as the winner
+                connection.close()
+    finally:
+        cancelled.set()
+        pool.shutdown(wait=True)
+    return found
@@ -0,0 +1,740 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:12:05 2026
+
+@author: Alexander Marsteller
+
+Byte level building blocks of the MNL 100 serial protocol.
+
+Replies from the laser look like  <@!TYPE PAYLOAD FCS \r  where FCS is the
+sum of all preceding bytes modulo 256 written as two upper case hex digits.
+Everything in here works directly on bytes, bytearray or memoryview frames.
+"""
+
+import struct
+from binascii import hexlify, unhexlify, Error as BinasciiError
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+from operator import itemgetter
+
+
+REQUEST_HEADER = b"#!@"
+REPLY_HEADER = b"<@!"
+RESPONSE_START_DELIMITER = 0x3C
+END_DELIMITER = 0x0D
+
+# two character upper case hex representation for every possible byte value
+HEX_BYTES = tuple("{:02X}".format(i).encode("ASCII") for i in range(256))
+
+
+class LaserProtocolError(IOError):
+    """Base class of all errors raised while decoding laser replies."""
+
+
+class FrameCheckError(LaserProtocolError):
+    """The frame check sequence of a reply does not match its content."""
+
+
+class MalformedReplyError(LaserProtocolError):
+    """A reply is too short, misses its header or has an invalid payload."""
+
+
+class UnknownReplyError(LaserProtocolError):
+    """A reply carries a type code no interpreter is registered for."""
+
+
+def frame_check_sequence(telegram):
+    """Return the two byte FCS of ``telegram`` (any bytes like object)."""
+    return HEX_BYTES[sum(telegram) & 0xFF]
+
+
+class CommandEncoder(object):
+    """
+    Builds ready to send request frames.
+
+    Frames of commands without parameter are composed once up front and
+    looked up by name. Frames with a parameter are composed on demand and
+    kept in a small LRU cache keyed on (command, parameter), which covers
+    the handful of setpoints an operator actually uses.
+    """
+
+    def __init__(self, command_dictionary, command_parameter_dictionary, cache_size=256):
+        self.command_codes = dict((name, code.encode("ASCII")) for name, code in command_dictionary.items())
+        self.command_parameters = command_parameter_dictionary
+
+        self.frames = dict((name, self._frame(code)) for name, code in self.command_codes.items())
+        self._encode_parameterized = lru_cache(maxsize=cache_size)(self._compose_parameterized)
+
+    @staticmethod
+    def _frame(body):
+        telegram = REQUEST_HEADER + body
+        return telegram + HEX_BYTES[sum(telegram) & 0xFF] + b"\r"
+
+    def _compose_parameterized(self, command_string, command_parameter):
+        limits = self.command_parameters[command_string]
+        if not limits["min"] <= command_parameter <= limits["max"]:
+            raise ValueError("Incompatible command parameter supplied for {}: {}".format(command_string,
+                                                                                        command_parameter))
+        parameter_string = "{0:0{1}X}".format(command_parameter, limits["length"]).encode("ASCII")
+        return self._frame(self.command_codes[command_string] + parameter_string)
+
+    def encode(self, command_string, command_parameter=None):
+        """ Return the request frame for a command as bytes. """
+        if command_parameter is None or self.command_parameters[command_string] is None:
+            return self.frames[command_string]
+        return self._encode_parameterized(command_string, command_parameter)
+
+    def longest_frame(self):
+        """ Length in bytes of the longest frame this encoder can produce. """
+        longest = 0
+        for name, code in self.command_codes.items():
+            limits = self.command_parameters.get(name)
+            length = len(REQUEST_HEADER) + len(code) + (limits["length"] if limits else 0) + 3
+            longest = max(longest, length)
+        return longest
+
+    def compose_many(self, commands):
+        """
+        Return the frames of a batch of commands as one buffer. ``commands``
+        holds command names or (command name, parameter) pairs.
+        """
+        frames = []
+        for command in commands:
+            if isinstance(command, str):
+                frames.append(self.encode(command))
+            else:
+                frames.append(self.encode(*command))
+        return b"".join(frames)
+
+
+class ReplyFramer(object):
+    """
+    Cuts the byte stream coming from the laser into reply frames.
+
+    Incoming bytes are copied into a reusable buffer of fixed capacity and
+    every complete  <...\r  frame with a valid FCS is yielded as a memoryview
+    into that buffer (without the end delimiter). A view is only valid until
+    the generator is advanced, so copy it if it has to be kept. Incomplete
+    frames are kept across calls, garbage and frames with a bad FCS are
+    skipped up to the next start delimiter.
+    """
+
+    def __init__(self, capacity=4096):
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._end = 0
+        self.discarded_bytes = 0
+        self.bad_frames = 0
+
+    def reset(self):
+        self.discarded_bytes += self._end - self._start
+        self._start = 0
+        self._end = 0
+
+    def feed(self, data):
+        """ Add received bytes and yield all frames completed by them. """
+        buffer = self._buffer
+        view = memoryview(buffer)
+        capacity = len(buffer)
+        position = 0
+        while position < len(data):
+            if self._start:
+                remaining = self._end - self._start
+                buffer[:remaining] = buffer[self._start:self._end]
+                self._start = 0
+                self._end = remaining
+            if self._end == capacity:
+                #a partial frame filled the whole buffer, it can't be valid
+                self.reset()
+
+            count = min(capacity - self._end, len(data) - position)
+            buffer[self._end:self._end + count] = data[position:position + count]
+            self._end += count
+            position += count
+
+            for frame in self._frames(buffer, view):
+                yield frame
+        view.release()
+
+    def _frames(self, buffer, view):
+        while True:
+            start = buffer.find(RESPONSE_START_DELIMITER, self._start, self._end)
+            if start < 0:
+                self.discarded_bytes += self._end - self._start
+                self._start = self._end
+                return
+            self.discarded_bytes += start - self._start
+            self._start = start
+
+            end = buffer.find(END_DELIMITER, start, self._end)
+            if end < 0:
+                return
+
+            #a start delimiter inside the frame means the previous frame was cut off
+            restart = buffer.rfind(RESPONSE_START_DELIMITER, start + 1, end)
+            if restart > 0:
+                self.discarded_bytes += restart - start
+                start = restart
+            self._start = end + 1
+
+            if (end - start < 6 or buffer[start:start + 3] != REPLY_HEADER
+                    or buffer[end - 2:end] != HEX_BYTES[sum(view[start:end - 2]) & 0xFF]):
+                self.bad_frames += 1
+                self.discarded_bytes += end + 1 - start
+                continue
+
+            yield view[start:end]
+
+
+class ReplyDispatcher(object):
+    """
+    Validates reply frames and hands their payload to the interpreter
+    registered for the reply type code.
+
+    Type codes are looked up with their first and (optionally) second byte,
+    so dispatching costs at most two dictionary lookups per frame.
+    """
+
+    def __init__(self):
+        self._table = {}
+
+    def register(self, prefix, response_type, interpreter):
+        if isinstance(prefix, str):
+            prefix = prefix.encode("ASCII")
+        if len(prefix) not in (1, 2):
+            raise ValueError("Reply type codes must be one or two characters long")
+
+        second = prefix[1] if len(prefix) == 2 else None
+        self._table.setdefault(prefix[0], {})[second] = (response_type, len(prefix), interpreter)
+
+    def decode(self, frame):
+        """
+        Decode a single frame and return ``(response_type, result)`` where
+        result is whatever the interpreter returned.
+        """
+        if isinstance(frame, str):
+            frame = frame.encode("ASCII")
+
+        end = len(frame)
+        if end and frame[end - 1] == END_DELIMITER:
+            end -= 1
+
+        if end < 6 or frame[:3] != REPLY_HEADER:
+            raise MalformedReplyError("Malformed reply: {!r}".format(bytes(frame)))
+
+        if frame[end - 2:end] != HEX_BYTES[sum(frame[:end - 2]) & 0xFF]:
+            raise FrameCheckError("Frame check sequence mismatch: {!r}".format(bytes(frame)))
+
+        candidates = self._table.get(frame[3])
+        entry = None
+        if candidates is not None:
+            if end - 2 > 4:
+                entry = candidates.get(frame[4])
+            if entry is None:
+                entry = candidates.get(None)
+        if entry is None:
+            raise UnknownReplyError("Unknown response type: {!r}".format(bytes(frame)))
+
+        response_type, prefix_length, interpreter = entry
+        try:
+            result = interpreter(frame[3 + prefix_length:end - 2])
+        except (ValueError, KeyError, IndexError) as e:
+            raise MalformedReplyError("Invalid {} payload: {!r} ({})".format(response_type, bytes(frame), e))
+
+        return response_type, result
+
+
+# the eight bits of every byte value, least significant bit first
+BYTE_BITS = tuple(map(tuple, map(reversed, product((False, True), repeat=8))))
+
+_STRUCT_CODES = {1: "B", 2: "H", 4: "I"}
+_SAMPLE_DTYPES = {1: ">u1", 2: ">u2", 4: ">u4"}
+
+
+def _numpy():
+    #NumPy takes longer to import than everything else together, so it is
+    #only loaded once energy samples are decoded or columns are asked for
+    import numpy
+    return numpy
+
+
+class Field(object):
+    """
+    An unsigned big endian integer of ``width`` bytes at byte ``offset`` of
+    the hex decoded payload, optionally multiplied by ``scale``. Optional
+    fields are set to None when a reply is too short to contain them.
+    """
+    __slots__ = ("name", "offset", "width", "scale", "optional")
+
+    def __init__(self, name, offset, width=1, scale=None, optional=False):
+        if width not in _STRUCT_CODES:
+            raise ValueError("Unsupported field width: {}".format(width))
+        self.name = name
+        self.offset = offset
+        self.width = width
+        self.scale = scale
+        self.optional = optional
+
+
+class FlagByte(object):
+    """
+    A single byte whose bits carry status flags. ``bits`` maps bit numbers
+    (0 = least significant) to the names the flags are published under.
+    The raw byte value itself is published as ``name``.
+    """
+    __slots__ = ("name", "offset", "bits")
+
+    def __init__(self, name, offset, bits):
+        self.name = name
+        self.offset = offset
+        self.bits = bits
+
+
+class SampleArray(object):
+    """
+    ``count_field`` values of ``width`` bytes each, directly following the
+    fixed part of the payload, published as a read-only NumPy array
+    (float64 when scaled).
+    """
+    __slots__ = ("name", "count_field", "width", "scale")
+
+    def __init__(self, name, count_field, width=2, scale=None):
+        if width not in _STRUCT_CODES:
+            raise ValueError("Unsupported sample width: {}".format(width))
+        self.name = name
+        self.count_field = count_field
+        self.width = width
+        self.scale = scale
+
+
+class TextTail(object):
+    """
+    Plain ASCII text following the hex encoded fixed part of the payload,
+    ``length_field`` characters long.
+    """
+    __slots__ = ("name", "length_field")
+
+    def __init__(self, name, length_field):
+        self.name = name
+        self.length_field = length_field
+
+
+class ReplyLayout(object):
+    """
+    Describes the payload of one reply type and compiles a decoder for it.
+
+    The payload is hex decoded once, all fixed fields are read with a single
+    precompiled struct and flag bytes are expanded through BYTE_BITS. The
+    result is a namedtuple named after the response type.
+    """
+
+    def __init__(self, response_type, prefix, fields, flags=(), samples=None, text=None, skip=0):
+        self.response_type = response_type
+        self.prefix = prefix
+        self.skip = skip
+        self.samples = samples
+        self.text = text
+
+        items = sorted(list(fields) + [Field(f.name, f.offset) for f in flags], key=lambda f: f.offset)
+        required = [f for f in items if not f.optional]
+        optional = [f for f in items if f.optional]
+        if optional and optional[0].offset < max(f.offset + f.width for f in required):
+            raise ValueError("Optional fields have to follow all required fields")
+        self._required_struct = self._compile_struct(required)
+        self._full_struct = self._compile_struct(items)
+        self._missing = (None,) * len(optional)
+        self._items = items
+        self._flag_bits = dict((flag.name, flag.bits) for flag in flags)
+        self._flag_fields = tuple(flags)
+
+        names = [f.name for f in items]
+        self._scaled = tuple((names.index(f.name), f.scale) for f in items
+                             if f.scale is not None)
+        self._flags = []
+        for flag in flags:
+            bit_numbers = sorted(flag.bits)
+            pick = itemgetter(*bit_numbers)
+            if len(bit_numbers) > 1:
+                table = tuple(map(pick, BYTE_BITS))
+            else:
+                table = tuple((pick(bits),) for bits in BYTE_BITS)
+            self._flags.append((names.index(flag.name), table))
+            names.extend(flag.bits[bit] for bit in bit_numbers)
+
+        self._count_index = None
+        self._sample_dtype = None
+        if samples is not None:
+            self._count_index = names.index(samples.count_field)
+            names.append(samples.name)
+        self._length_index = None
+        if text is not None:
+            self._length_index = names.index(text.length_field)
+            names.append(text.name)
+
+        self.record_type = namedtuple(response_type + "Reply", names)
+        self.record_type.response_type = response_type
+
+        self._columns = None
+
+    @staticmethod
+    def _compile_struct(fields):
+        code = ">"
+        position = 0
+        for f in fields:
+            if f.offset < position:
+                raise ValueError("Overlapping field: {}".format(f.name))
+            code += "x" * (f.offset - position) + _STRUCT_CODES[f.width]
+            position = f.offset + f.width
+        return struct.Struct(code)
+
+    def default_record(self):
+        """ The record published before the first reply has arrived. """
+        values = list(self._full_struct.unpack(bytes(self._full_struct.size)))
+        for index, table in self._flags:
+            values.extend(table[0])
+        if self.samples is not None:
+            values.append(())
+        if self.text is not None:
+            values.append("")
+        return self.record_type._make(values)
+
+    def encode(self, values, skipped=None):
+        """
+        The complete reply frame carrying ``values`` (field name -> value),
+        the inverse of decode(). Fields not given are 0, flag bytes are
+        combined from their named bits, optional fields given as None are
+        left out and sample counts and text lengths default to the length
+        of the samples and text. ``skipped`` fills the ``skip`` characters
+        decode() ignores.
+        """
+        row = []
+        required_only = False
+        for f in self._items:
+            value = values.get(f.name, 0)
+            if f.name in self._flag_bits:
+                for bit, name in self._flag_bits[f.name].items():
+                    if values.get(name):
+                        value |= 1 << bit
+            elif self.samples is not None and f.name == self.samples.count_field and f.name not in values:
+                value = len(values.get(self.samples.name, ()))
+            elif self.text is not None and f.name == self.text.length_field and f.name not in values:
+                value = len(values.get(self.text.name, ""))
+            if value is None and f.optional:
+                required_only = True
+                continue
+            if f.scale is not None:
+                value = int(round(value / f.scale))
+            row.append(value)
+        fixed_struct = self._required_struct if required_only else self._full_struct
+        data = fixed_struct.pack(*row)
+        if self.samples is not None:
+            np = _numpy()
+            samples = np.asarray(values.get(self.samples.name, ()), dtype=np.float64)
+            if self.samples.scale is not None:
+                samples = np.round(samples / self.samples.scale)
+            data += samples.astype(_SAMPLE_DTYPES[self.samples.width]).tobytes()
+        payload = (b"0" * self.skip if skipped is None else skipped) + hexlify(data).upper()
+        if self.text is not None:
+            payload += values.get(self.text.name, "").encode("ASCII")
+        telegram = REPLY_HEADER + self.prefix.encode("ASCII") + payload
+        return telegram + frame_check_sequence(telegram) + b"\r"
+
+    def columns(self):
+        """
+        (name, dtype) of every fixed width value of the record, in record
+        order. Optional and scaled fields are float64 so None becomes NaN.
+        """
+        if self._columns is None:
+            np = _numpy()
+            columns = [(f.name, np.dtype(np.float64) if f.scale is not None or f.optional
+                        else np.dtype("=u{}".format(f.width))) for f in self._items]
+            for flag in self._flag_fields:
+                columns.extend((flag.bits[bit], np.dtype(np.bool_)) for bit in sorted(flag.bits))
+            self._columns = columns
+        return list(self._columns)
+
+    def frame_length(self, samples=0, text_length=16):
+        """ Length in bytes of a complete reply frame of this type. """
+        length = len(REPLY_HEADER) + len(self.prefix) + self.skip + 2 * self._full_struct.size + 3
+        if self.samples is not None:
+            length += 2 * self.samples.width * samples
+        if self.text is not None:
+            length += text_length
+        return length
+
+    def decode(self, payload):
+        """ Decode the payload (everything between type code and FCS). """
+        hex_end = len(payload)
+        if self.text is not None:
+            hex_end = self.skip + 2 * self._full_struct.size
+        try:
+            data = unhexlify(payload[self.skip:hex_end])
+        except (BinasciiError, TypeError):
+            raise ValueError("Payload is not hex encoded")
+
+        if len(data) >= self._full_struct.size:
+            values = list(self._full_struct.unpack_from(data))
+        elif len(data) >= self._required_struct.size:
+            values = list(self._required_struct.unpack_from(data))
+            values.extend(self._missing)
+        else:
+            raise ValueError("Payload too short")
+
+        for index, scale in self._scaled:
+            if values[index] is not None:
+                values[index] = values[index] * scale
+        for index, table in self._flags:
+            values.extend(table[values[index]])
+
+        if self._count_index is not None:
+            values.append(self._decode_samples(data, values[self._count_index]))
+        if self._length_index is not None:
+            text = bytes(payload[hex_end:hex_end + values[self._length_index]])
+            values.append(text.decode("ASCII"))
+
+        return self.record_type._make(values)
+
+    def _decode_samples(self, data, count):
+        samples = self.samples
+        offset = self._full_struct.size
+        if len(data) < offset + count * samples.width:
+            raise ValueError("Payload too short for {} samples".format(count))
+        if self._sample_dtype is None:
+            #resolved once instead of parsing the dtype string for every reply
+            np = _numpy()
+            self._sample_dtype = np.dtype(_SAMPLE_DTYPES[samples.width])
+            self._frombuffer = np.frombuffer
+            self._multiply = np.multiply
+        values = self._frombuffer(data, self._sample_dtype, count, offset)
+        if samples.scale is not None:
+            values = self._multiply(values, samples.scale)
+            values.setflags(write=False)
+        return values
+
+
+ENERGY_SCALE = 250.0 / 64000 # micro Joule per digit
+
+REPLY_LAYOUTS = (
+    ReplyLayout("GetShortStatus", "W", [Field("status_code", 0)]),
+    ReplyLayout("GetStat7", "UT",
+                [Field("quantity", 3, 2), Field("frequency", 5), Field("hv", 6),
+                 Field("energy", 9, 2, optional=True)],
+                flags=[FlagByte("flag_byte_1", 0, {0: "shutter_open", 2: "ready", 3: "standby",
+                                                   4: "repetition_on", 5: "burst_on",
+                                                   6: "external_trigger_on", 7: "mode_off"}),
+                       FlagByte("flag_byte_3", 2, {0: "service_mode_activated", 5: "eeprom_error",
+                                                   6: "cpu_error"})]),
+    ReplyLayout("GetStat8", "UU",
+                [Field("internal_voltage", 2), Field("temperature1", 3), Field("temperature2", 4),
+                 Field("energy", 5, 2), Field("quantity_counter", 7, 2),
+                 Field("shot_counter_value", 9, 4)],
+                flags=[FlagByte("flag_byte_4", 0, {0: "static_error", 1: "laser_head_open", 2: "remote",
+                                                   3: "temperature_limit", 4: "temperature_warning_1",
+                                                   5: "temperature_warning_2", 6: "energy_monitor_error"}),
+                       FlagByte("flag_byte_5", 1, {0: "operation_error", 3: "hv_error",
+                                                   4: "temperature_error_1", 5: "temperature_error_2",
+                                                   6: "power_supply_error", 7: "power_supply_weak"})]),
+    ReplyLayout("GetSernum", "US",
+                [Field("stepper_mode", 0), Field("stepper_setpoint", 1, 2),
+                 Field("actual_stepper_position", 3, 2), Field("actual_transmission", 5, scale=0.5)]),
+    ReplyLayout("GetAttenuatorStatus", "UV",
+                [Field("laser_serial_number", 0, 4), Field("energy_monitor_serial_number", 4, 2)]),
+    ReplyLayout("GetEnergyValues", "P",
+                [Field("stored_energy_value_count", 0), Field("following_energy_values", 1)],
+                samples=SampleArray("energy_values", "following_energy_values", 2, scale=ENERGY_SCALE)),
+    ReplyLayout("GetVer3", "V",
+                [Field("main_rev_byte", 0), Field("release_byte", 1), Field("type_byte_1", 2),
+                 Field("type_byte_2", 3), Field("program_version", 4, 4), Field("following_chars", 8)],
+                text=TextTail("laser_type", "following_chars"), skip=1),
+)
+
+# reply type publishing each field name; later layouts win for shared names
+REPLY_FIELD_OWNERS = dict((name, layout.response_type)
+                          for layout in REPLY_LAYOUTS for name in layout.record_type._fields)
+
+# bit of every published field in LaserStatus.changed
+STATUS_FIELD_BITS = dict((name, 1 << number) for number, name in enumerate(REPLY_FIELD_OWNERS))
+ALL_STATUS_FIELDS = (1 << len(STATUS_FIELD_BITS)) - 1
+
+
+
+def status_field_mask(*names):
+    """ The LaserStatus.changed bits of the fields ``names``. """
+    mask = 0
+    for name in names:
+        mask |= STATUS_FIELD_BITS[name]
+    return mask
+
+
+_REPLY_INDEX = dict((layout.response_type, index) for index, layout in enumerate(REPLY_LAYOUTS))
+
+
+def _status_change_checks(layout):
+    #(record index, bit) of the fields a reply type publishes, split into
+    #plain values and sample arrays, which compare by identity
+    values = []
+    samples = []
+    for position, name in enumerate(layout.record_type._fields):
+        if REPLY_FIELD_OWNERS[name] != layout.response_type:
+            continue
+        if layout.samples is not None and name == layout.samples.name:
+            samples.append((position, STATUS_FIELD_BITS[name]))
+        else:
+            values.append((position, STATUS_FIELD_BITS[name]))
+    return tuple(values), tuple(samples)
+
+
+_STATUS_CHANGE_CHECKS = tuple(map(_status_change_checks, REPLY_LAYOUTS))
+
+
+class LaserStatus(tuple):
+    """
+    Immutable snapshot of the latest record of every reply type.
+
+    Every reply produces a new snapshot replacing the previous one as a
+    whole, so a consumer holding one never sees half of an update. Fields
+    read like handler attributes (status.shutter_open, status.temperature1,
+    shared names as in REPLY_FIELD_OWNERS) and record() returns a complete
+    record. ``changed`` carries the STATUS_FIELD_BITS of the fields that
+    differ from the previous snapshot, ``response_type`` names the reply
+    that produced it and ``sequence`` counts the snapshots. A reply
+    repeating the previous one of its type produces no new snapshot.
+    """
+    __slots__ = ()
+
+    _CHANGED = len(REPLY_LAYOUTS)
+    _SEQUENCE = _CHANGED + 1
+    _RESPONSE_TYPE = _CHANGED + 2
+
+    changed = property(itemgetter(_CHANGED))
+    sequence = property(itemgetter(_SEQUENCE))
+    response_type = property(itemgetter(_RESPONSE_TYPE))
+
+    @classmethod
+    def initial(cls):
+        """ The snapshot before the first reply: default records, every field changed. """
+        records = [layout.default_record() for layout in REPLY_LAYOUTS]
+        return tuple.__new__(cls, records + [ALL_STATUS_FIELDS, 0, None])
+
+    def record(self, response_type):
+        return self[_REPLY_INDEX[response_type]]
+
+    def updated(self, response_type, record):
+        """
+        The snapshot following this one after ``record`` of ``response_type``
+        arrived, or this one if the record equals the previous one.
+        """
+        index = _REPLY_INDEX[response_type]
+        previous = self[index]
+        values, samples = _STATUS_CHANGE_CHECKS[index]
+        if not samples and previous == record:
+            #a repeated reply, keep the equal record and the snapshot
+            return self
+        changed = 0
+        for position, bit in samples:
+            if previous[position] is not record[position]:
+                changed |= bit
+        for position, bit in values:
+            if previous[position] != record[position]:
+                changed |= bit
+        #built from small tuples, which come from the interpreter's free lists
+        return tuple.__new__(LaserStatus, self[:index] + (record,) + self[index + 1:self._CHANGED]
+                             + (changed, self[self._SEQUENCE] + 1, response_type))
+
+    def has_changed(self, *names):
+        return bool(self.changed & status_field_mask(*names))
+
+    def changed_fields(self):
+        return [name for name, bit in STATUS_FIELD_BITS.items() if self.changed & bit]
+
+    def __repr__(self):
+        return "LaserStatus(sequence={}, response_type={!r}, changed={})".format(
+            self.sequence, self.response_type, self.changed_fields())
+
+
+def _status_field(index, position):
+    return property(lambda status: status[index][position])
+
+
+for _name, _response_type in REPLY_FIELD_OWNERS.items():
+    if hasattr(LaserStatus, _name):
+        raise ValueError("Reply field {} hides LaserStatus.{}".format(_name, _name))
+    setattr(LaserStatus, _name, _status_field(_REPLY_INDEX[_response_type],
+                                              REPLY_LAYOUTS[_REPLY_INDEX[_response_type]]
+                                              .record_type._fields.index(_name)))
+del _name, _response_type
+
+# query and record field reading back the state a command sets, together
+# with the expected value (None expects the command parameter itself).
+# LaserOn has none: it only powers the high voltage supply, GetStat7 reports
+# ready before and after it and standby only once a mode is started
+SETPOINT_READBACKS = {
+    "SetShutter": ("GetStat7", "shutter_open", None),
+    "SetRepetitionFrequency": ("GetStat7", "frequency", None),
+    "SetBurstQuantity": ("GetStat7", "quantity", None),
+    "SetHV": ("GetStat7", "hv", None),
+    "SetStepperPosition": ("GetSernum", "stepper_setpoint", None),
+    "RepetitionOn": ("GetStat7", "repetition_on", True),
+    "BurstOn": ("GetStat7", "burst_on", True),
+    "ExtTrigmode": ("GetStat7", "external_trigger_on", True),
+}
+
+# scheduling classes of outgoing commands, lower values are sent first
+PRIORITY_SAFETY = 0
+PRIORITY_SETPOINT = 1
+PRIORITY_TELEMETRY = 2
+
+SAFETY_COMMANDS = {"LaserStop": None, "LaserOff": None, "SetShutter": 0}
+
+
+def command_priority(command_string, command_parameter=None):
+    """ Scheduling class of a command: safety, setpoint or telemetry. """
+    if command_string in SAFETY_COMMANDS and SAFETY_COMMANDS[command_string] == command_parameter:
+        return PRIORITY_SAFETY
+    if command_string.startswith("Get"):
+        return PRIORITY_TELEMETRY
+    return PRIORITY_SETPOINT
+
+
+# setpoint commands sharing one coalescing key because they set the same
+# state, the attenuator's stepper is moved by all three
+SHARED_COALESCING_KEYS = {"SetStepperPosition": "stepper", "SetTransmission": "stepper",
+                          "SetAttenuationEnergy": "stepper"}
+
+
+def coalescing_key(command_string, command_parameter=None):
+    """
+    Pending requests with the same key are merged: a repeated query is sent
+    only once and a newer setpoint replaces the value of an older one.
+    Commands whose order or repetition matters get no key.
+    """
+    if command_string.startswith("Get") or command_parameter is not None:
+        return SHARED_COALESCING_KEYS.get(command_string, command_string)
+    return None
+
+
+class Capabilities(namedtuple("Capabilities", "shutter_control attenuator hv_control energy_measuring")):
+    """ Optional features of a laser, taken from the release byte of GetVer3. """
+    __slots__ = ()
+
+    @classmethod
+    def from_release_byte(cls, release_byte):
+        bits = BYTE_BITS[release_byte]
+        return cls(shutter_control=not bits[0], attenuator=bits[1], hv_control=bits[3], energy_measuring=bits[6])
+
+    def unsupported_commands(self):
+        unsupported = set()
+        for capability, commands in CAPABILITY_COMMANDS.items():
+            if not getattr(self, capability):
+                unsupported.update(commands)
+        return unsupported
+
+
+# commands that only work if the laser has the respective option
+CAPABILITY_COMMANDS = {
+    "shutter_control": ("SetShutter",),
+    "attenuator": ("GetSernum", "SetStepperPosition", "SetTransmission", "SetAttenuationEnergy", "InitAttenuator"),
+    "hv_control": ("SetHV", "IncrementHV", "DecrementHV"),
+    "energy_measuring": ("GetEnergyValues",),
+}
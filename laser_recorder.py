@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 22:40:31 2026
+
+@author: Alexander Marsteller
+
+Recording of everything the laser reports into memory-mapped column files.
+
+A recording is a directory with one sub directory per table (one table per
+reply type plus ``energy_values`` for the individual pulse energies) and a
+``recording.json`` describing the columns and how many rows are valid. Each
+column is a flat file of fixed width values, so a multi-day recording can
+be read back with TelemetryRecording as NumPy arrays that are paged in on
+access instead of loaded.
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+
+import numpy as np
+
+from laser_protocol import REPLY_LAYOUTS
+
+
+TIMESTAMP_COLUMN = ("timestamp", np.dtype(np.int64))
+ENERGY_TABLE = "energy_values"
+METADATA_FILE = "recording.json"
+
+
+def _write_metadata(directory, metadata):
+    path = os.path.join(directory, METADATA_FILE)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as metadata_file:
+        json.dump(metadata, metadata_file, indent=1, sort_keys=True)
+    os.replace(temporary_path, path)
+
+
+class ColumnTable(object):
+    """
+    Columns of one table, each in its own file and mapped into memory.
+    Files grow by ``chunk_rows`` rows at a time and are cut to the number
+    of written rows on close().
+    """
+
+    def __init__(self, directory, columns, chunk_rows=65536):
+        self.directory = directory
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._capacity = 0
+        self._maps = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".bin")
+
+    def _grow(self, rows):
+        capacity = self._capacity
+        while capacity < rows:
+            capacity += self.chunk_rows
+        for name, dtype in self.columns:
+            if name in self._maps:
+                self._maps[name].flush()
+                del self._maps[name]
+            with open(self._path(name), "ab") as column_file:
+                column_file.truncate(capacity * dtype.itemsize)
+            self._maps[name] = np.memmap(self._path(name), dtype=dtype, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def append(self, column_values):
+        """ Write whole columns at once, ``column_values`` in column order. """
+        count = len(column_values[0])
+        end = self.rows + count
+        if end > self._capacity:
+            self._grow(end)
+        for (name, dtype), values in zip(self.columns, column_values):
+            self._maps[name][self.rows:end] = values
+        self.rows = end
+
+    def flush(self):
+        for column in self._maps.values():
+            column.flush()
+
+    def close(self):
+        self.flush()
+        self._maps = {}
+        for name, dtype in self.columns:
+            if os.path.exists(self._path(name)):
+                with open(self._path(name), "r+b") as column_file:
+                    column_file.truncate(self.rows * dtype.itemsize)
+        self._capacity = self.rows
+
+    def describe(self):
+        return {"rows": self.rows, "columns": [[name, dtype.str] for name, dtype in self.columns]}
+
+
+class TelemetryRecorder(object):
+    """
+    Appends every decoded reply to a new recording below ``root``.
+
+    record() only buffers the row, together with a time.monotonic_ns()
+    timestamp. Buffered rows are written in one go per column when
+    ``batch_rows`` rows are waiting or ``flush_interval`` seconds have
+    passed, and on flush()/close(). The offset between the monotonic clock
+    and wall clock time is stored with the recording so timestamps can be
+    matched against other data afterwards.
+    """
+
+    def __init__(self, root, layouts=REPLY_LAYOUTS, batch_rows=256, flush_interval=5.0, chunk_rows=65536):
+        self.directory = os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+        suffix = 1
+        while os.path.exists(self.directory):
+            suffix += 1
+            self.directory = os.path.join(root, time.strftime("%Y%m%d-%H%M%S") + "-{}".format(suffix))
+        os.makedirs(self.directory)
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._pending = {}
+        self._column_counts = {}
+        for layout in layouts:
+            columns = layout.columns()
+            self._column_counts[layout.response_type] = len(columns)
+            self._add_table(layout.response_type, [TIMESTAMP_COLUMN] + columns, chunk_rows)
+        self._add_table(ENERGY_TABLE, [TIMESTAMP_COLUMN, ("energy", np.dtype(np.float64))], chunk_rows)
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self.metadata = {"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                         "wall_clock_offset_ns": time.time_ns() - time.monotonic_ns(),
+                         "tables": {}}
+        self.closed = False
+        self._write_metadata()
+
+    def _add_table(self, name, columns, chunk_rows):
+        self._tables[name] = ColumnTable(os.path.join(self.directory, name), columns, chunk_rows)
+        self._pending[name] = []
+
+    def record(self, response_type, record, timestamp=None):
+        column_count = self._column_counts.get(response_type)
+        if column_count is None:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        with self._lock:
+            if self.closed:
+                return
+            self._pending[response_type].append((timestamp,) + tuple(record[:column_count]))
+            self._pending_rows += 1
+            if response_type == "GetEnergyValues" and len(record.energy_values):
+                self._pending[ENERGY_TABLE].append((timestamp, record.energy_values))
+            if self._pending_rows >= self.batch_rows or \
+                    time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        for name, rows in self._pending.items():
+            if not rows:
+                continue
+            table = self._tables[name]
+            if name == ENERGY_TABLE:
+                energies = np.concatenate([values for timestamp, values in rows])
+                timestamps = np.repeat([timestamp for timestamp, values in rows],
+                                       [len(values) for timestamp, values in rows])
+                table.append((timestamps, energies))
+            else:
+                table.append([np.array(column, dtype=dtype)
+                              for column, (column_name, dtype) in zip(zip(*rows), table.columns)])
+            table.flush()
+            self._pending[name] = []
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self._write_metadata()
+
+    def _write_metadata(self):
+        self.metadata["tables"] = {name: table.describe() for name, table in self._tables.items()}
+        try:
+            _write_metadata(self.directory, self.metadata)
+        except (IOError, OSError) as e:
+            logging.warning("Could not write recording metadata: {}".format(e))
+
+    def flush(self):
+        with self._lock:
+            if not self.closed:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self._flush()
+            for table in self._tables.values():
+                table.close()
+            self.closed = True
+            self._write_metadata()
+
+
+class TelemetryRecording(object):
+    """
+    Read access to a recording written by TelemetryRecorder. Columns are
+    returned as read-only memory maps, also while the recording is still
+    being written (up to the last flush).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, METADATA_FILE)) as metadata_file:
+            self.metadata = json.load(metadata_file)
+        self.wall_clock_offset_ns = self.metadata["wall_clock_offset_ns"]
+
+    @property
+    def tables(self):
+        return sorted(self.metadata["tables"])
+
+    def columns(self, table):
+        return [name for name, dtype in self.metadata["tables"][table]["columns"]]
+
+    def column(self, table, name):
+        description = self.metadata["tables"][table]
+        dtypes = dict(description["columns"])
+        rows = description["rows"]
+        if rows == 0:
+            return np.zeros(0, dtype=dtypes[name])
+        return np.memmap(os.path.join(self.directory, table, name + ".bin"), dtype=dtypes[name],
+                         mode="r", shape=(rows,))
+
+    def table(self, table):
+        """ All columns of a table as {name: array}. """
+        return {name: self.column(table, name) for name in self.columns(table)}
+
+    def wall_time(self, timestamps):
+        """ Monotonic timestamps [ns] converted to Unix time [s]. """
+        return (np.asarray(timestamps) + self.wall_clock_offset_ns) / 1e9
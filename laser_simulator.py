@@ -0,0 +1,665 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:26:03 2026
+
+@author: Alexander Marsteller
+
+Simulated MNL 100 for testing without hardware.
+
+LaserModel implements the laser side of the protocol as a state machine
+(power, repetition/burst/external trigger mode, shutter, HV, attenuator
+stepper, temperatures, shot counter and energy monitor). It can be
+reached either through a pseudo terminal (PtyLaserSimulator, POSIX only),
+which the normal serial.Serial code path opens like a real port, or
+in-process through the serial-like SimulatedSerial. Both pace their
+replies like a real line of the given baud rate and add a response
+latency, and both can corrupt the line with a FaultInjector.
+
+The behaviour follows the traffic recorded in communications_log.txt:
+status codes and flag bytes change on LaserOn, RepetitionOn, BurstOn,
+LaserStop and LaserOff the same way the real laser's do.
+"""
+
+import os
+import time
+import select
+import threading
+import logging
+from collections import deque
+
+import numpy as np
+
+from laser_protocol import REQUEST_HEADER, REPLY_LAYOUTS, HEX_BYTES, ENERGY_SCALE
+
+
+# request code -> (model method, number of hex parameter digits)
+FIRMWARE_COMMANDS = {
+    b"X": ("laser_off", 0),
+    b"g": ("laser_on", 0),
+    b"h": ("repetition_on", 0),
+    b"j": ("burst_on", 0),
+    b"u": ("external_trigger_on", 0),
+    b"i": ("laser_stop", 0),
+    b"l": ("set_burst_quantity", 4),
+    b"m": ("set_repetition_frequency", 2),
+    b"n": ("set_hv", 2),
+    b"o1": ("increment_hv", 0),
+    b"o0": ("decrement_hv", 0),
+    b"z": ("set_shutter", 1),
+    b"O3": ("set_stepper_position", 4),
+    b"O4": ("set_transmission", 2),
+    b"O5": ("set_attenuation_energy", 4),
+    b"O60000": ("init_attenuator", 0),
+    b"W": ("short_status", 0),
+    b"UT": ("stat7", 0),
+    b"UU": ("stat8", 0),
+    b"V3": ("version", 0),
+    b"US": ("stepper_status", 0),
+    b"UV": ("attenuator_status", 0),
+    b"P": ("energy_values", 0),
+}
+
+STATUS_STANDBY = 0
+STATUS_STOPPED = 1
+STATUS_FIRING = 3
+
+STEPPER_POSITIONS = 400
+STEPPER_IDLE = 0
+STEPPER_MOVING = 1
+STEPPER_INITIALIZING = 2
+
+
+class LaserModel(object):
+    """
+    State of a simulated laser. handle() takes one request frame (without
+    the end delimiter) and returns the reply frame or None, the way the
+    firmware answers: queries get a reply, commands are silently executed
+    and frames with a wrong FCS or unknown code are ignored.
+
+    Time only moves forward when a request arrives; pulses, stepper
+    movement and temperatures are brought up to date from the monotonic
+    clock at that point, so the model needs no thread of its own.
+    """
+
+    def __init__(self, laser_serial_number=12298, energy_monitor_serial_number=4711,
+                 release_byte=0x4A, program_version=0x0203, laser_type="MNL 100",
+                 max_energy=120.0, energy_jitter=0.015, ambient_temperature=25.0,
+                 stepper_speed=200.0, samples_per_reply=50, sample_memory=255, seed=None,
+                 clock=time.monotonic):
+        self.laser_serial_number = laser_serial_number
+        self.energy_monitor_serial_number = energy_monitor_serial_number
+        self.release_byte = release_byte
+        self.program_version = program_version
+        self.laser_type = laser_type
+        self.max_energy = max_energy
+        self.energy_jitter = energy_jitter
+        self.ambient_temperature = ambient_temperature
+        self.stepper_speed = stepper_speed
+        self.samples_per_reply = samples_per_reply
+        self.clock = clock
+        self._random = np.random.default_rng(seed)
+        self._layouts = dict((layout.response_type, layout) for layout in REPLY_LAYOUTS)
+        self._codes = sorted(FIRMWARE_COMMANDS, key=len, reverse=True)
+        self._lock = threading.Lock()
+
+        self.powered = False
+        self.standby = False
+        self.mode = None #None, "repetition", "burst" or "external"
+        self.shutter_open = False
+        self.burst_quantity = 50
+        self.burst_count = 0
+        self.frequency = 10
+        self.hv = 100
+        self.internal_voltage = 0.0
+        self.temperature1 = ambient_temperature + 5.0
+        self.temperature2 = ambient_temperature + 12.0
+        self.shot_counter = 0x4602E6
+        self.last_energy = 0.0
+        self.energy_samples = deque(maxlen=sample_memory)
+        self.stepper_mode = STEPPER_IDLE
+        self.stepper_setpoint = STEPPER_POSITIONS - 1
+        self.stepper_position = float(STEPPER_POSITIONS - 1)
+        self._time = clock()
+        self._next_pulse = None
+
+    @property
+    def energy_measuring(self):
+        return bool(self.release_byte & 0x40)
+
+    def handle(self, frame):
+        """ Execute one request frame and return the reply frame (or None). """
+        frame = bytes(frame).rstrip(b"\r")
+        if not frame.startswith(REQUEST_HEADER) or len(frame) < len(REQUEST_HEADER) + 3:
+            return None
+        if HEX_BYTES[sum(frame[:-2]) & 0xFF] != frame[-2:]:
+            logging.debug("Simulator ignores frame with bad FCS: %r", frame)
+            return None
+        body = frame[len(REQUEST_HEADER):-2]
+        for code in self._codes:
+            if body.startswith(code):
+                method, digits = FIRMWARE_COMMANDS[code]
+                parameter = body[len(code):]
+                if len(parameter) != digits:
+                    continue
+                with self._lock:
+                    self._advance(self.clock())
+                    if digits:
+                        return getattr(self, method)(int(parameter, 16))
+                    return getattr(self, method)()
+        logging.debug("Simulator ignores unknown request: %r", frame)
+        return None
+
+    # time evolution
+
+    def _advance(self, now):
+        elapsed = max(now - self._time, 0.0)
+        self._time = now
+        if self.mode in ("repetition", "burst") and self.frequency > 0:
+            self._fire_until(now)
+        self._move_stepper(elapsed)
+        self._drift(elapsed)
+
+    def _fire_until(self, now):
+        if self._next_pulse is None:
+            self._next_pulse = now
+        period = 1.0 / self.frequency
+        count = int((now - self._next_pulse) / period) + 1 if now >= self._next_pulse else 0
+        if self.mode == "burst":
+            count = min(count, self.burst_quantity - self.burst_count)
+        if count <= 0:
+            return
+        self._next_pulse += count * period
+        self.shot_counter = (self.shot_counter + count) & 0xFFFFFFFF
+        if self.mode == "burst":
+            self.burst_count += count
+            if self.burst_count >= self.burst_quantity:
+                self.mode = None
+                self._next_pulse = None
+        energies = self._pulse_energies(min(count, self.energy_samples.maxlen))
+        if self.energy_measuring:
+            self.energy_samples.extend(energies)
+        self.last_energy = float(energies[-1])
+
+    def _pulse_energies(self, count):
+        nominal = self.max_energy * (self.hv / 100.0) ** 2 * self.transmission / 100.0
+        #hotter gas gives slightly less energy
+        nominal *= 1.0 - 0.002 * max(self.temperature1 - self.ambient_temperature, 0.0)
+        energies = nominal * (1.0 + self.energy_jitter * self._random.standard_normal(count))
+        return np.clip(energies, 0.0, 0xFFFF * ENERGY_SCALE)
+
+    def _move_stepper(self, elapsed):
+        if self.stepper_mode == STEPPER_IDLE:
+            return
+        step = self.stepper_speed * elapsed
+        distance = self.stepper_setpoint - self.stepper_position
+        if abs(distance) <= step:
+            self.stepper_position = float(self.stepper_setpoint)
+            self.stepper_mode = STEPPER_IDLE
+        else:
+            self.stepper_position += step if distance > 0 else -step
+
+    def _drift(self, elapsed):
+        firing = self.mode in ("repetition", "burst")
+        heat = self.frequency * self.hv / 100.0 * 0.8 if firing else 0.0
+        for name, offset, time_constant in (("temperature1", 5.0, 600.0), ("temperature2", 12.0, 1200.0)):
+            target = self.ambient_temperature + offset + heat
+            current = getattr(self, name)
+            current += (target - current) * (1.0 - np.exp(-elapsed / time_constant))
+            current += 0.02 * np.sqrt(elapsed) * self._random.standard_normal()
+            setattr(self, name, current)
+        target_voltage = 214.0 if self.powered else 0.0
+        self.internal_voltage += (target_voltage - self.internal_voltage) * (1.0 - np.exp(-elapsed / 0.5))
+
+    @property
+    def transmission(self):
+        """ Attenuator transmission in percent, from the stepper position. """
+        return 100.0 * self.stepper_position / (STEPPER_POSITIONS - 1)
+
+    # commands
+
+    def laser_on(self):
+        self.powered = True
+
+    def laser_off(self):
+        self.powered = False
+        self.standby = False
+        self.mode = None
+        self._next_pulse = None
+
+    def _start(self, mode):
+        if not self.powered:
+            return
+        self.standby = True
+        self.mode = mode
+        self._next_pulse = self._time
+        if mode == "burst":
+            self.burst_count = 0
+
+    def repetition_on(self):
+        self._start("repetition")
+
+    def burst_on(self):
+        self._start("burst")
+
+    def external_trigger_on(self):
+        self._start("external")
+
+    def laser_stop(self):
+        self.mode = None
+        self._next_pulse = None
+
+    def set_burst_quantity(self, quantity):
+        self.burst_quantity = quantity
+
+    def set_repetition_frequency(self, frequency):
+        self.frequency = frequency
+        if self._next_pulse is not None:
+            self._next_pulse = self._time
+
+    def set_hv(self, hv):
+        self.hv = min(hv, 100)
+
+    def increment_hv(self):
+        self.hv = min(self.hv + 1, 100)
+
+    def decrement_hv(self):
+        self.hv = max(self.hv - 1, 0)
+
+    def set_shutter(self, state):
+        self.shutter_open = bool(state)
+
+    def set_stepper_position(self, position):
+        self.stepper_setpoint = min(position, STEPPER_POSITIONS - 1)
+        self.stepper_mode = STEPPER_MOVING
+
+    def set_transmission(self, half_percent):
+        self.set_stepper_position(int(round(half_percent / 200.0 * (STEPPER_POSITIONS - 1))))
+
+    def set_attenuation_energy(self, energy):
+        full = self.max_energy * (self.hv / 100.0) ** 2
+        transmission = min(energy / full, 1.0) if full else 0.0
+        self.set_stepper_position(int(round(transmission * (STEPPER_POSITIONS - 1))))
+
+    def init_attenuator(self):
+        self.stepper_position = 0.0
+        self.stepper_setpoint = STEPPER_POSITIONS - 1
+        self.stepper_mode = STEPPER_INITIALIZING
+
+    # queries
+
+    def _reply(self, response_type, values, skipped=None):
+        return self._layouts[response_type].encode(values, skipped)
+
+    def _status_code(self):
+        if self.mode is not None:
+            return STATUS_FIRING
+        return STATUS_STOPPED if self.standby else STATUS_STANDBY
+
+    def _energy_digits(self):
+        if not self.energy_measuring:
+            return 0
+        return int(round(self.last_energy / ENERGY_SCALE))
+
+    def short_status(self):
+        return self._reply("GetShortStatus", {"status_code": self._status_code()})
+
+    def stat7(self):
+        return self._reply("GetStat7", {
+            "shutter_open": self.shutter_open, "ready": True, "standby": self.standby,
+            "repetition_on": self.mode == "repetition", "burst_on": self.mode == "burst",
+            "external_trigger_on": self.mode == "external", "flag_byte_3": 0x02,
+            "quantity": self.burst_quantity, "frequency": self.frequency, "hv": self.hv,
+            "energy": self._energy_digits()})
+
+    def stat8(self):
+        temperature1 = int(round(self.temperature1))
+        temperature2 = int(round(self.temperature2))
+        return self._reply("GetStat8", {
+            "temperature_limit": max(temperature1, temperature2) > 60,
+            "temperature_warning_1": temperature1 > 48, "temperature_warning_2": temperature2 > 48,
+            "internal_voltage": min(int(self.internal_voltage), 0xFF),
+            "temperature1": min(max(temperature1, 0), 0xFF), "temperature2": min(max(temperature2, 0), 0xFF),
+            "energy": self._energy_digits(),
+            "quantity_counter": self.burst_count if self.mode == "burst" else 0,
+            "shot_counter_value": self.shot_counter})
+
+    def version(self):
+        return self._reply("GetVer3", {
+            "main_rev_byte": 1, "release_byte": self.release_byte, "type_byte_1": 0x10,
+            "type_byte_2": 0x00, "program_version": self.program_version,
+            "laser_type": self.laser_type}, skipped=b"3")
+
+    def stepper_status(self):
+        if not self.release_byte & 0x02:
+            return None
+        return self._reply("GetSernum", {
+            "stepper_mode": self.stepper_mode, "stepper_setpoint": self.stepper_setpoint,
+            "actual_stepper_position": int(round(self.stepper_position)),
+            "actual_transmission": round(self.transmission * 2) / 2.0})
+
+    def attenuator_status(self):
+        return self._reply("GetAttenuatorStatus", {
+            "laser_serial_number": self.laser_serial_number,
+            "energy_monitor_serial_number": self.energy_monitor_serial_number})
+
+    def energy_values(self):
+        if not self.energy_measuring:
+            return None
+        stored = len(self.energy_samples)
+        count = min(stored, self.samples_per_reply)
+        samples = [self.energy_samples.popleft() for i in range(count)]
+        return self._reply("GetEnergyValues", {"stored_energy_value_count": stored,
+                                               "energy_values": samples})
+
+
+class RequestSplitter(object):
+    """ Collects written bytes and returns the complete request frames. """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data):
+        self._buffer += bytes(data)
+        *frames, self._buffer = self._buffer.split(b"\r")
+        return frames
+
+
+class FaultProfile(object):
+    """
+    How often a simulated line misbehaves. Rates are probabilities per
+    byte (bit flips, dropped bytes) or per reply (delays, reordering,
+    disconnects). A disconnect silences the line in both directions for
+    ``disconnect_duration`` seconds, like a stalled USB adapter.
+    """
+
+    def __init__(self, bit_flip_rate=0.0, drop_rate=0.0, delay_rate=0.0, delay=(0.05, 0.5),
+                 reorder_rate=0.0, disconnect_rate=0.0, disconnect_duration=1.0):
+        self.bit_flip_rate = bit_flip_rate
+        self.drop_rate = drop_rate
+        self.delay_rate = delay_rate
+        self.delay = delay
+        self.reorder_rate = reorder_rate
+        self.disconnect_rate = disconnect_rate
+        self.disconnect_duration = disconnect_duration
+
+
+FAULT_PROFILES = {
+    "clean": FaultProfile(),
+    "bit_flips": FaultProfile(bit_flip_rate=1e-3),
+    "dropped_bytes": FaultProfile(drop_rate=1e-3),
+    "delays": FaultProfile(delay_rate=0.05),
+    "reordering": FaultProfile(reorder_rate=0.05),
+    "disconnects": FaultProfile(disconnect_rate=0.01),
+    "production": FaultProfile(bit_flip_rate=2e-4, drop_rate=2e-4, delay_rate=0.01, reorder_rate=0.005,
+                               disconnect_rate=0.001),
+}
+
+
+class FaultInjector(object):
+    """
+    Applies a FaultProfile to the replies of a simulated line and counts
+    what it did. ``outages`` lists the (start, end) of every disconnect.
+    """
+
+    def __init__(self, profile, seed=None):
+        self.profile = profile
+        self._random = np.random.default_rng(seed)
+        self._held = None
+        self._disconnected_until = 0.0
+        self.flipped_bits = 0
+        self.dropped_bytes = 0
+        self.delayed_replies = 0
+        self.reordered_replies = 0
+        self.lost_replies = 0
+        self.outages = []
+
+    def disconnected(self, now):
+        return now < self._disconnected_until
+
+    def _chance(self, rate):
+        return rate > 0 and self._random.random() < rate
+
+    def _corrupt(self, reply):
+        profile = self.profile
+        if profile.bit_flip_rate > 0:
+            flips = self._random.binomial(len(reply), profile.bit_flip_rate)
+            if flips:
+                reply = bytearray(reply)
+                for position, bit in zip(self._random.integers(0, len(reply), flips),
+                                         self._random.integers(0, 8, flips)):
+                    reply[position] ^= 1 << bit
+                reply = bytes(reply)
+                self.flipped_bits += flips
+        if profile.drop_rate > 0:
+            keep = self._random.random(len(reply)) >= profile.drop_rate
+            if not keep.all():
+                self.dropped_bytes += int(len(reply) - keep.sum())
+                reply = bytes(np.frombuffer(reply, np.uint8)[keep])
+        return reply
+
+    def process(self, replies):
+        """ Faulty version of a list of (start, end, reply) deliveries. """
+        profile = self.profile
+        result = []
+        for index, (start, end, reply) in enumerate(replies):
+            if self._chance(profile.disconnect_rate):
+                self._disconnected_until = start + profile.disconnect_duration
+                self.outages.append((start, self._disconnected_until))
+                self.lost_replies += len(replies) - index + (self._held is not None)
+                self._held = None
+                break
+            reply = self._corrupt(reply)
+            if not reply:
+                continue
+            if self._chance(profile.delay_rate):
+                delay = self._random.uniform(*profile.delay)
+                start += delay
+                end += delay
+                self.delayed_replies += 1
+            if self._held is not None:
+                result.append((start, end, reply))
+                held_start, held_end, held_reply = self._held
+                result.append((end, end + held_end - held_start, held_reply))
+                self._held = None
+            elif self._chance(profile.reorder_rate):
+                self._held = (start, end, reply)
+                self.reordered_replies += 1
+            else:
+                result.append((start, end, reply))
+        return result
+
+
+class _ReplyLine(object):
+    """
+    Outgoing side of a simulated line: replies become readable only once a
+    real line of ``baud_rate`` could have carried request and reply, plus
+    ``latency``. An optional FaultInjector corrupts the traffic.
+    """
+
+    def __init__(self, model, baud_rate, latency, faults=None, bits_per_byte=10):
+        self.model = model
+        self.byte_time = bits_per_byte / float(baud_rate) if baud_rate else 0.0
+        self.latency = latency
+        self.faults = faults
+        self._splitter = RequestSplitter()
+        self._line_free = 0.0
+
+    def requests(self, data, now):
+        """
+        Feed written bytes, return [(first byte time, last byte time,
+        reply)] for the replies they trigger.
+        """
+        replies = []
+        arrival = now + len(data) * self.byte_time
+        for frame in self._splitter.feed(data):
+            if self.faults is not None and self.faults.disconnected(arrival):
+                continue
+            reply = self.model.handle(frame)
+            if reply is None:
+                continue
+            start = max(arrival + self.latency, self._line_free)
+            self._line_free = start + len(reply) * self.byte_time
+            replies.append((start, self._line_free, reply))
+        if self.faults is not None and replies:
+            replies = self.faults.process(replies)
+        return replies
+
+
+class SimulatedSerial(object):
+    """
+    Serial port look-alike connected to a LaserModel in the same process,
+    for platforms without pseudo terminals and for tests that don't need
+    the serial.Serial code path.
+    """
+
+    def __init__(self, model=None, baud_rate=9600, latency=0.002, timeout=0.2, faults=None):
+        self.model = model if model is not None else LaserModel()
+        self.timeout = timeout
+        self.is_open = True
+        self.faults = faults
+        self._line = _ReplyLine(self.model, baud_rate, latency, faults)
+        self._scheduled = []
+        self._buffer = bytearray()
+        self._condition = threading.Condition()
+        self._cancelled = False
+
+    def _collect(self, now):
+        while self._scheduled and self._scheduled[0][1] <= now:
+            self._buffer += self._scheduled.pop(0)[2]
+
+    @property
+    def in_waiting(self):
+        with self._condition:
+            self._collect(time.monotonic())
+            return len(self._buffer)
+
+    def write(self, data):
+        replies = self._line.requests(data, time.monotonic())
+        with self._condition:
+            self._scheduled.extend(replies)
+            self._scheduled.sort(key=lambda delivery: delivery[1])
+            self._condition.notify_all()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._collect(now)
+                if self._buffer or self._cancelled:
+                    break
+                wait = None
+                if self._scheduled:
+                    wait = self._scheduled[0][1] - now
+                if deadline is not None:
+                    if now >= deadline:
+                        break
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._condition.wait(wait)
+            self._cancelled = False
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def read_until(self, terminator=b"\r"):
+        data = b""
+        while not data.endswith(terminator):
+            chunk = self.read(1)
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def reset_input_buffer(self):
+        with self._condition:
+            del self._scheduled[:]
+            del self._buffer[:]
+
+    def cancel_read(self):
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def close(self):
+        self.is_open = False
+
+
+class PtyLaserSimulator(object):
+    """
+    Serves a LaserModel on the slave end of a pseudo terminal; ``port`` is
+    the device path to open with serial.Serial. Replies are written byte
+    paced at ``baud_rate`` after ``latency``, through ``faults`` (a
+    FaultInjector) if given. POSIX only.
+    """
+
+    def __init__(self, model=None, baud_rate=9600, latency=0.002, faults=None):
+        self.model = model if model is not None else LaserModel()
+        self.baud_rate = baud_rate
+        self.latency = latency
+        self.faults = faults
+        self.port = None
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="LaserSimulator")
+        self._thread.daemon = True
+        self._thread.start()
+        logging.info("Simulated laser listening on {}".format(self.port))
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _serve(self):
+        line = _ReplyLine(self.model, self.baud_rate, self.latency, self.faults)
+        chunk_time = 0.005
+        chunk_size = max(int(chunk_time / line.byte_time), 1) if line.byte_time else 4096
+        outgoing = []
+        while self._running:
+            timeout = 0.05
+            if outgoing:
+                timeout = max(min(outgoing[0][0] - time.monotonic(), timeout), 0.0)
+            readable, writable, failed = select.select([self._master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self._master, 4096)
+                except OSError:
+                    break
+                outgoing.extend(line.requests(data, time.monotonic()))
+                outgoing.sort(key=lambda delivery: delivery[0])
+            while outgoing and outgoing[0][0] <= time.monotonic():
+                start, end, reply = outgoing.pop(0)
+                self._send_paced(reply, line.byte_time, chunk_size)
+
+    def _send_paced(self, reply, byte_time, chunk_size):
+        for offset in range(0, len(reply), chunk_size):
+            chunk = reply[offset:offset + chunk_size]
+            os.write(self._master, chunk)
+            if offset + chunk_size < len(reply):
+                time.sleep(len(chunk) * byte_time)
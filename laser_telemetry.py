@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:05:16 2026
+
+@author: Alexander Marsteller
+
+Fixed size in-memory history of what the laser reported, and running
+statistics over it.
+"""
+
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from laser_protocol import ENERGY_SCALE
+
+
+class EnergyRing(object):
+    """
+    The most recent ``capacity`` pulse energies in a preallocated float64
+    array.
+
+    Every value is written twice, at its ring position and one capacity
+    further, so the newest n values are always contiguous and window()
+    returns them as a view without copying. Appending costs O(1) per value
+    and memory stays at 2 * capacity * 8 bytes however long the laser runs.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._values = np.zeros(2 * capacity, dtype=np.float64)
+        self._head = 0
+        self._length = 0
+        self.total_count = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, value):
+        head = self._head
+        self._values[head] = value
+        self._values[head + self.capacity] = value
+        self._head = (head + 1) % self.capacity
+        self._length = min(self._length + 1, self.capacity)
+        self.total_count += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        count = len(values)
+        if count == 0:
+            return
+        if count > self.capacity:
+            values = values[-self.capacity:]
+        stored = len(values)
+        head = self._head
+        capacity = self.capacity
+        first = capacity - head
+        if stored <= first:
+            self._values[head:head + stored] = values
+            self._values[head + capacity:head + capacity + stored] = values
+        else:
+            self._values[head:capacity] = values[:first]
+            self._values[capacity + head:] = values[:first]
+            self._values[:stored - first] = values[first:]
+            self._values[capacity:capacity + stored - first] = values[first:]
+        self._head = (head + stored) % self.capacity
+        self._length = min(self._length + stored, self.capacity)
+        self.total_count += count
+
+    def window(self, count=None):
+        """ View of the newest ``count`` values (all if None), oldest first. """
+        if count is None or count > self._length:
+            count = self._length
+        end = self._head + self.capacity
+        return self._values[end - count:end]
+
+    def clear(self):
+        self._head = 0
+        self._length = 0
+
+
+class MessageRing(object):
+    """
+    The most recent ``capacity`` raw reply frames (bytes) with their
+    reception time. Slots are preallocated and overwritten in place, so
+    adding a message costs O(1) instead of the list.pop(0) it replaces.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._frames = [None] * capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self._head = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, frame, timestamp=None):
+        head = self._head
+        self._frames[head] = frame
+        self.timestamps[head] = time.time() if timestamp is None else timestamp
+        self._head = (head + 1) % self.capacity
+        if self._length < self.capacity:
+            self._length += 1
+
+    def _index(self, position):
+        return (self._head - self._length + position) % self.capacity
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self._length))]
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("message index out of range")
+        return self._frames[self._index(position)]
+
+    def __iter__(self):
+        for position in range(self._length):
+            yield self._frames[self._index(position)]
+
+    def last(self, count):
+        """ The newest ``count`` messages as (timestamp, frame) pairs, oldest first. """
+        count = min(count, self._length)
+        indices = [self._index(position) for position in range(self._length - count, self._length)]
+        return [(self.timestamps[i], self._frames[i]) for i in indices]
+
+
+EnergyWindowStatistics = namedtuple("EnergyWindowStatistics",
+                                    "count mean std minimum maximum rms_stability percentiles")
+
+
+class EnergyStatistics(object):
+    """
+    Pulse energy statistics over consecutive windows of ``window`` pulses.
+
+    update() folds each batch of samples into the open window: mean and
+    variance are merged with the parallel (Chan) update, min/max directly,
+    and a fixed-bin histogram gives percentiles to within one bin width.
+    Batches of up to ``small_batch`` samples, as single P replies bring,
+    are added in a plain loop, where NumPy's per-call overhead would
+    dominate; larger ones with vectorized operations and np.bincount. The
+    histogram buffer is allocated once and cleared between windows.
+    Finished windows are kept in ``windows`` (newest last, at most
+    ``history`` of them).
+
+    rms_stability is the pulse-to-pulse standard deviation relative to the
+    mean, in percent.
+    """
+
+    def __init__(self, window=1000, percentiles=(5, 50, 95), bins=4096,
+                 value_range=(0.0, 65536 * ENERGY_SCALE), history=100, small_batch=64):
+        self.window = window
+        self.percentiles = tuple(percentiles)
+        self.bins = bins
+        self.value_range = value_range
+        self.small_batch = small_batch
+        self._bin_width = (value_range[1] - value_range[0]) / bins
+        self._bins_per_unit = 1.0 / self._bin_width
+        self._edges = value_range[0] + self._bin_width * np.arange(bins + 1)
+        self._histogram = np.zeros(bins, dtype=np.int64)
+        #the same buffer, its items read and written as Python ints
+        self._counts = memoryview(self._histogram)
+        self.windows = deque(maxlen=history)
+        self._reset()
+
+    def _reset(self):
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._minimum = float("inf")
+        self._maximum = float("-inf")
+        self._histogram.fill(0)
+
+    def update(self, values):
+        """ Add samples, returns the statistics of every window they completed. """
+        values = np.asarray(values, dtype=np.float64)
+        completed = []
+        while len(values):
+            chunk = values[:self.window - self._count]
+            values = values[len(chunk):]
+            if len(chunk) <= self.small_batch:
+                self._add_few(chunk.tolist())
+            else:
+                self._add(chunk)
+            if self._count == self.window:
+                completed.append(self.current())
+                self._reset()
+        self.windows.extend(completed)
+        return completed
+
+    def _add_few(self, values):
+        count = len(values)
+        mean = sum(values) / count
+        m2 = 0.0
+        counts = self._counts
+        low = self.value_range[0]
+        bins_per_unit = self._bins_per_unit
+        last = self.bins - 1
+        for value in values:
+            deviation = value - mean
+            m2 += deviation * deviation
+            index = int((value - low) * bins_per_unit)
+            if 0 <= index <= last:
+                counts[index] += 1
+            else:
+                counts[0 if index < 0 else last] += 1
+        self._merge(count, mean, m2, min(values), max(values))
+
+    def _add(self, chunk):
+        count = len(chunk)
+        mean = float(chunk.sum()) / count
+        deviation = chunk - mean
+        indices = ((chunk - self.value_range[0]) * self._bins_per_unit).astype(np.intp)
+        np.minimum(indices, self.bins - 1, out=indices)
+        np.maximum(indices, 0, out=indices)
+        self._histogram += np.bincount(indices, minlength=self.bins)
+        self._merge(count, mean, float(np.dot(deviation, deviation)), float(chunk.min()), float(chunk.max()))
+
+    def _merge(self, count, mean, m2, minimum, maximum):
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self._count * count / total
+        self._count = total
+        self._minimum = min(self._minimum, minimum)
+        self._maximum = max(self._maximum, maximum)
+
+    def _percentiles(self):
+        cumulative = np.cumsum(self._histogram)
+        result = []
+        for percentile in self.percentiles:
+            rank = percentile / 100.0 * self._count
+            index = min(int(np.searchsorted(cumulative, rank)), self.bins - 1)
+            below = cumulative[index - 1] if index else 0
+            inside = self._histogram[index]
+            fraction = (rank - below) / inside if inside else 0.0
+            value = self._edges[index] + fraction * self._bin_width
+            result.append(float(min(max(value, self._minimum), self._maximum)))
+        return tuple(result)
+
+    def current(self):
+        """ Statistics of the window still being filled, None while it is empty. """
+        if not self._count:
+            return None
+        mean = float(self._mean)
+        std = float(np.sqrt(self._m2 / self._count))
+        stability = 100.0 * std / mean if mean else float("nan")
+        return EnergyWindowStatistics(self._count, mean, std, float(self._minimum), float(self._maximum),
+                                      stability, self._percentiles())
+
+    def latest(self):
+        """ The last finished window, or the open one before any has finished. """
+        if self.windows:
+            return self.windows[-1]
+        return self.current()
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:31:09 2026
+
+@author: Alexander Marsteller
+
+LaserCommunicationThread, the Qt frontend of the serial link: connects to
+the laser, runs SerialLink in a QThread and reports replies to the GUI
+through signals. Only imported when a Qt frontend asks for it.
+"""
+
+import serial
+import serial.tools.list_ports
+from PyQt5.QtCore import (QThread, pyqtSignal)
+import os
+import sys
+import time
+import threading
+import logging
+
+from laser_protocol import command_priority, coalescing_key, Capabilities, SETPOINT_READBACKS
+from laser_handler import LaserCommunicationHandler
+from laser_transport import (SerialLink, CommandRequest, PollScheduler, UnsupportedCommandError,
+                             PENDING_FLUSH)
+from laser_cache import CapabilityCache, PortIdentityCache
+from laser_telemetry import MessageRing
+from laser_capture import CapturingSerial
+from laser_ports import open_port, probe_port, detect_laser
+from concurrent.futures import Future
+
+python_version = float(sys.version_info.major)
+serial_version = float(serial.__version__)
+
+
+class LaserCommunicationThread(QThread):
+    
+    
+    #the new LaserStatus snapshot after every reply changing the status
+    update_main_window_signal = pyqtSignal(object)
+    connection_state_signal = pyqtSignal(str)
+    
+    
+    def __init__(self, main_window, com_port=None, debug=False, capability_cache=None,
+                 message_limit=1000, recorder=None, capture=None, port_cache=None,
+                 pending_policy=PENDING_FLUSH):
+        QThread.__init__(self)
+        if debug:
+            logging.debug("LaserCommunicationThread is in debug mode")
+        
+        logging.info("Initializing LaserCommunicationThread")
+        logging.info("Looking for available COM ports...")
+        self.available_comports = list(serial.tools.list_ports.comports())
+        
+        if len(self.available_comports) >= 1:
+            for p in self.available_comports:
+                logging.info(p.device)
+        else:
+            logging.critical("No COM ports found.")
+        
+        
+        
+        logging.debug("Connecting to GUI")
+        self.main_window = main_window
+        self.update_main_window_signal.connect(self.main_window.display_laser_status)
+        self.connection_state_signal.connect(self.main_window.ui.connection_label.setText)
+        
+        logging.debug("Creating and attaching laser communication handler")
+        self.handler = LaserCommunicationHandler()
+        self.capability_cache = capability_cache if capability_cache is not None else CapabilityCache()
+        self.port_cache = port_cache if port_cache is not None else PortIdentityCache()
+        #serial connection parameters
+        
+        
+        logging.debug("Setting up serial connection parameters")
+        self.set_connection_label("Setting serial connection parameters")
+        self.baud_rate = 9600
+        self.parity = serial.PARITY_NONE
+        self.bytesize = 8
+        self.stopbits = 1
+        self.rtscts = 1
+        self.write_timeout = 5
+        self.timeout = 0.2
+        #seconds every COM port gets to answer the detection handshake
+        self.probe_deadline = 0.5
+        
+        default_failed = False
+        connect_start = time.monotonic()
+        #True once the laser has answered on the port, no need to wait for it to settle
+        self.port_verified = False
+        
+        self.simulator = None
+        self.used_com_port = None
+        if debug and hasattr(os, "openpty"):
+            #serve a simulated laser on a pseudo terminal and connect to it like to a real one
+            from laser_simulator import PtyLaserSimulator
+            self.simulator = PtyLaserSimulator()
+            com_port = self.simulator.start()
+        
+        if not debug or self.simulator is not None:
+            if com_port != None:
+                
+                self.set_connection_label("Trying to connect using specified com port: {}".format(com_port))
+                logging.info("Trying to connect using specified com port: {}".format(com_port))
+                try:
+                    self.serial_connection = open_port(com_port, self.serial_settings())
+                    self.set_connection_label("Connected to laser on COM port: {}".format(com_port))
+                    self.used_com_port = com_port
+                except serial.SerialException:
+                    self.set_connection_label("No serial connection possible on specified COM port")
+                    logging.critical("No serial connection possible on specified COM port")
+                    default_failed = True
+    
+            if com_port == None or default_failed:
+                if default_failed:
+                    logging.info("Specified COM port failed, trying to detect Laser...")
+                else:
+                    logging.info("No COM port specified, trying to detect Laser...")
+                found = self.find_known_port()
+                if found is not None:
+                    self.used_com_port, self.serial_connection = found
+                    self.port_verified = True
+                if self.used_com_port == None:
+                    self.set_connection_label("Searching for the laser on {} COM ports".format(len(self.available_comports)))
+                    found = detect_laser([port.device for port in self.available_comports], self.serial_settings(),
+                                         self.handler.encode_command("GetShortStatus"), self.probe_deadline)
+                    if found is not None:
+                        self.used_com_port, self.serial_connection = found
+                        self.port_verified = True
+                if self.used_com_port != None:
+                    self.set_connection_label("Connected to laser on COM port: {}".format(self.used_com_port))
+                    logging.info("Connected to laser on COM port {} after {:.0f} ms".format(
+                        self.used_com_port, (time.monotonic() - connect_start) * 1e3))
+                                
+            if self.used_com_port == None:
+                self.set_connection_label("Could not detect laser")
+                logging.critical("Laser not found over serial interface")
+                raise serial.SerialException("Laser not found over serial interface") 
+        else:
+            self.set_connection_label("Connected to simulated laser")
+            logging.debug("Connected to simulated laser")
+            from laser_simulator import SimulatedSerial
+            self.serial_connection = SimulatedSerial()
+        
+        #optional CaptureWriter receiving the raw traffic in both directions
+        self.capture = capture
+        if self.capture is not None:
+            self.serial_connection = CapturingSerial(self.serial_connection, self.capture)
+            
+        self.message_limit = message_limit
+        self.recieved_messages = MessageRing(self.message_limit)
+        #optional TelemetryRecorder receiving every decoded reply
+        self.recorder = recorder
+        self.poller = PollScheduler(self.handler.query_frame_lengths(), baud_rate=self.baud_rate)
+        self.link = SerialLink(self.serial_connection, self._reply_received, self.handler.decode_reply,
+                               poll=self._poll, reopen=self.reopen_port, pending_policy=pending_policy,
+                               on_connection_change=self._connection_changed)
+        logging.debug("Setting Thread operating parameters:")
+        logging.debug("\tPolling time: {}".format(self.status_poll_interval))
+        logging.debug("\tMaximum replies in memory: {}".format(self.message_limit))
+    
+    def find_known_port(self, devices=()):
+        """
+        Probe the ports a laser was connected to before (see
+        PortIdentityCache), most recently used first, then ``devices``.
+        Returns (device, open connection) or None.
+        """
+        handshake = self.handler.encode_command("GetShortStatus")
+        candidates = self.port_cache.candidates(self.available_comports)
+        candidates += [device for device in devices if device is not None and device not in candidates]
+        for device in candidates:
+            self.set_connection_label("Trying last used COM port: {}".format(device))
+            try:
+                connection = probe_port(device, self.serial_settings(), handshake, self.probe_deadline)
+            except (serial.SerialException, OSError, ValueError) as e:
+                logging.info("Could not probe last used COM port {}: {}".format(device, e))
+                continue
+            if connection is not None:
+                logging.info("Laser found on last used COM port: {}".format(device))
+                return device, connection
+        logging.info("Laser not found on a known COM port")
+        return None
+    
+    def reopen_port(self):
+        """
+        Called by the link after the connection failed: look for the laser
+        on its known ports, then on all ports. Returns the new connection or
+        None.
+        """
+        self.available_comports = list(serial.tools.list_ports.comports())
+        found = self.find_known_port([self.used_com_port])
+        if found is None:
+            found = detect_laser([port.device for port in self.available_comports], self.serial_settings(),
+                                 self.handler.encode_command("GetShortStatus"), self.probe_deadline)
+        if found is None:
+            return None
+        self.used_com_port, connection = found
+        if self.capture is not None:
+            connection = CapturingSerial(connection, self.capture)
+        self.serial_connection = connection
+        return connection
+    
+    def _connection_changed(self, connected, error):
+        if connected:
+            self.connection_state_signal.emit("Reconnected to laser on COM port: {}".format(self.used_com_port))
+        else:
+            self.connection_state_signal.emit("Connection to laser lost, reconnecting...")
+    
+    @property
+    def outage_durations(self):
+        """ Seconds from each connection loss until the laser was reconnected. """
+        return list(self.link.outages)
+    
+    def remember_port(self, laser_serial_number):
+        if self.simulator is not None or self.used_com_port is None:
+            return
+        port_info = None
+        for port in self.available_comports:
+            if port.device == self.used_com_port:
+                port_info = port
+        self.port_cache.store(laser_serial_number, self.used_com_port, port_info)
+    
+    def serial_settings(self):
+        return {"baudrate": self.baud_rate, "parity": self.parity, "bytesize": self.bytesize,
+                "stopbits": self.stopbits, "rtscts": self.rtscts, "timeout": self.timeout,
+                "write_timeout": self.write_timeout}
+    
+    @property
+    def alive(self):
+        return self.link.alive
+    
+    @alive.setter
+    def alive(self, alive):
+        if not alive:
+            self.link.stop()
+    
+    @property
+    def status_poll_interval(self):
+        #scales the whole poll schedule, 0.5 s is the schedule as designed
+        return 0.5 * self.poller.interval_scale
+    
+    @status_poll_interval.setter
+    def status_poll_interval(self, interval):
+        self.poller.set_interval_scale(interval / 0.5)
+        self.link.reschedule_poll()
+    
+    def run(self):
+        
+        logging.info("Communication Thread started running")
+        if not self.port_verified:
+            time.sleep(2.0)
+        
+        self.link.start()
+        self.discover_capabilities()
+        self.link.run_reader()
+        self.link.join()
+        try:
+            self.link.serial_connection.close()
+        except (serial.SerialException, OSError):
+            pass
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.capture is not None:
+            self.capture.close()
+        if self.simulator is not None:
+            self.simulator.stop()
+        
+        logging.info("Communication Thread ended")
+    
+    def discover_capabilities(self):
+        """
+        Ask the laser for its serial number and look its options up in the
+        capability cache; only unknown lasers are asked for GetVer3. Queries
+        and commands the laser does not support are not sent afterwards.
+        """
+        def version_received(future, laser_serial_number=None):
+            if future.exception() is not None:
+                logging.warning("Could not determine laser capabilities: {}".format(future.exception()))
+                return
+            release_byte = future.result().release_byte
+            if laser_serial_number is not None:
+                self.capability_cache.store(laser_serial_number, release_byte)
+            self.apply_capabilities(Capabilities.from_release_byte(release_byte))
+        
+        def serial_number_received(future):
+            if future.exception() is None:
+                laser_serial_number = future.result().laser_serial_number
+                self.remember_port(laser_serial_number)
+                capabilities = self.capability_cache.lookup(laser_serial_number)
+                if capabilities is not None:
+                    logging.info("Using cached capabilities of laser {}".format(laser_serial_number))
+                    self.apply_capabilities(capabilities)
+                    return
+            else:
+                laser_serial_number = None
+            version = self.execute_command("GetVer3", retries=1)
+            version.add_done_callback(lambda f: version_received(f, laser_serial_number))
+        
+        self.execute_command("GetAttenuatorStatus", retries=1).add_done_callback(serial_number_received)
+    
+    def apply_capabilities(self, capabilities):
+        logging.info("Laser capabilities: {}".format(capabilities))
+        self.handler.set_capabilities(capabilities)
+        for command in self.handler.unsupported_commands:
+            self.poller.remove(command)
+    
+    def _poll(self, now):
+        commands, next_due = self.poller.due(now)
+        for command in commands:
+            self.execute_command(command)
+        return next_due
+    
+    def _reply_received(self, message, response_type, record):
+        if self.poller.observe(response_type, record, len(message)):
+            self.link.reschedule_poll()
+        self.recieved_messages.append(message)
+        if self.recorder is not None:
+            self.recorder.record(response_type, record)
+        #the snapshot is complete before it is emitted, the GUI only ever
+        #gets whole snapshots and never reads the handler while it changes
+        previous = self.handler.status
+        status = self.handler.apply_reply(response_type, record)
+        if status is not previous:
+            self.update_main_window_signal.emit(status)
+    
+    def set_connection_label(self, string):
+        if threading.current_thread() is not threading.main_thread():
+            #reconnecting in the reader, the GUI is updated through its event loop
+            self.connection_state_signal.emit(string)
+            return
+        self.main_window.ui.connection_label.setText(string)
+        self.main_window.app.processEvents()
+    
+    def _waiting_bytes(self):
+        global python_version
+        global serial_version
+        
+        incoming_byts_in_buffer = 0
+            
+        if python_version >= 3 and serial_version >=3:
+            incoming_byts_in_buffer = self.serial_connection.in_waiting
+        else:
+            incoming_byts_in_buffer = self.serial_connection.inWaiting()
+    
+        return incoming_byts_in_buffer
+    
+    def execute_command(self, command_string, command_parameter=None, timeout=1.0, retries=0, confirm=False):
+        """
+        Queue a command and return a concurrent.futures.Future. It resolves
+        with the decoded reply record, or with an Acknowledgement once written
+        for commands without reply. With confirm=True setpoints are read back
+        until the laser reports the new value (see SETPOINT_READBACKS).
+        """
+        logging.debug("Queing command: %s %s", command_string, command_parameter)
+        
+        if not self.handler.supports(command_string):
+            future = Future()
+            future.set_exception(UnsupportedCommandError("The laser does not support {}".format(command_string)))
+            return future
+        
+        #also built without confirm, a pending request this one is merged
+        #into may be confirmed and then has to read back the new value
+        readback = None
+        if confirm or command_string in SETPOINT_READBACKS:
+            readback = self.handler.readback_for(command_string, command_parameter)
+        request = CommandRequest(command_string, self.handler.encode_command(command_string, command_parameter),
+                                 self.handler.reply_type_for(command_string), timeout, retries,
+                                 readback if confirm else None,
+                                 command_priority(command_string, command_parameter),
+                                 coalescing_key(command_string, command_parameter), readback)
+        return self.link.request(request)
+    
+    def LaserOn(self):
+        return self.execute_command("LaserOn")
+    
+    def LaserOff(self):
+        return self.execute_command("LaserOff")
+    
+    def OpenShutter(self):
+        return self.execute_command("SetShutter", 1)
+        
+    def CloseShutter(self):
+        return self.execute_command("SetShutter", 0)
+    
+    def RepetitionOn(self):
+        return self.execute_command("RepetitionOn")
+    
+    def BurstOn(self):
+        return self.execute_command("BurstOn")
+    
+    def ExternalTriggerOn(self):
+        return self.execute_command("ExtTrigmode")
+    
+    def Stop(self):
+        return self.execute_command("LaserStop")
+    
+    def setRepetitionRate(self, frequency):
+        return self.execute_command("SetRepetitionFrequency", frequency)
+    
+    def setRepetitionQuantity(self, quantity):
+        return self.execute_command("SetBurstQuantity", quantity)
+        
+    
+    def ToggleShutter(self):
+        if not self.handler.shutter_open:
+            return self.OpenShutter()
+        else:
+            return self.CloseShutter()
+            
+    def QueryStatus(self):
+        self.execute_command("GetShortStatus")
+        self.execute_command("GetStat7")
+        self.execute_command("GetStat8")
+        
+    def QueryShortStatus(self):
+        self.execute_command("GetShortStatus")
@@ -0,0 +1,742 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:21:48 2026
+
+@author: Alexander Marsteller
+
+Reader and writer loops moving frames between the serial port and the
+protocol handler.
+"""
+
+import threading
+import time
+import logging
+from collections import deque, namedtuple
+from concurrent.futures import Future
+
+from laser_protocol import ReplyFramer, LaserProtocolError, PRIORITY_SAFETY, PRIORITY_SETPOINT
+
+
+# result of commands the laser does not answer, set once the frame is written
+Acknowledgement = namedtuple("Acknowledgement", "command sent_time")
+
+
+class LinkError(IOError):
+    """Base class of errors reported through command futures."""
+
+
+class CommandTimeoutError(LinkError):
+    """No reply arrived within the timeout, retries included."""
+
+
+class SetpointNotAppliedError(LinkError):
+    """The read back value never matched the setpoint."""
+
+
+class LinkClosedError(LinkError):
+    """The link was stopped before the command completed."""
+
+
+class UnsupportedCommandError(LinkError):
+    """The laser lacks the option a command needs, it was not sent."""
+
+
+class LinkLostError(LinkError):
+    """The serial connection failed before the command completed."""
+
+
+# what happens to queued and unanswered commands when the connection fails
+PENDING_FLUSH = "flush"     # they fail with LinkLostError
+PENDING_REPLAY = "replay"   # they are sent again once reconnected
+
+
+class CommandRequest(object):
+    """
+    A queued command. ``reply_type`` names the reply that completes it, or is
+    None for commands the laser does not answer. ``confirm`` optionally holds
+    (query command, query frame, predicate) used to read a setpoint back.
+    ``readback`` holds the same for the value of this request even when it is
+    not confirmed, a pending request it is merged into may have to be.
+    """
+    __slots__ = ("command", "frame", "reply_type", "timeout", "retries", "confirm", "priority", "coalesce_key",
+                 "readback", "sequence", "future", "deadline", "queued_time")
+
+    def __init__(self, command, frame, reply_type=None, timeout=1.0, retries=0, confirm=None,
+                 priority=PRIORITY_SETPOINT, coalesce_key=None, readback=None):
+        self.command = command
+        self.frame = frame
+        self.reply_type = reply_type
+        self.timeout = timeout
+        self.retries = retries
+        self.confirm = confirm
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.readback = readback if readback is not None else confirm
+        self.sequence = None
+        self.future = Future()
+        self.deadline = None
+        self.queued_time = None
+
+
+def forward_result(source, target):
+    """ Resolve future ``target`` with the outcome of future ``source``. """
+    def forward(source):
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+    source.add_done_callback(forward)
+
+
+class CommandScheduler(object):
+    """
+    Outgoing commands ordered by priority class and first in, first out
+    within a class. Enqueueing and dequeueing cost O(1) for the fixed number
+    of classes. The scheduler is not locked itself, SerialLink only uses it
+    with its condition held.
+
+    Requests with a ``coalesce_key`` are combined with a pending request of
+    the same key, and both futures resolve with the same result. The
+    request sent is confirmed if either asked for it, reading back the
+    newer value. If no command was queued after the pending request, the
+    pending one keeps its place and takes over the frame of the newer
+    request. A pending query also moves up to a more urgent class, but never
+    down. Otherwise the pending request is dropped and the newer one queued
+    at the tail of its own class. This applies when a command such as
+    IncrementHV was queued in between, or when a command changes class
+    (SetShutter 1 after a pending SetShutter 0). The newer value is then
+    never sent ahead of commands queued before it.
+    """
+
+    def __init__(self, priorities=3):
+        self._queues = tuple(deque() for i in range(priorities))
+        self._pending = {}
+        self._length = 0
+        self._sequence = 0
+        #sequence number of the last command (request without reply) queued
+        self._last_command = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return self._length
+
+    def push(self, request, front=False):
+        """ Queue a request, returns False if it was merged into a pending one. """
+        key = request.coalesce_key
+        existing = self._pending.get(key) if key is not None else None
+        if existing is not None:
+            self.coalesced += 1
+            if existing.confirm is not None and request.confirm is None:
+                request.confirm = request.readback
+            is_query = existing.reply_type is not None
+            if existing.sequence >= self._last_command and (is_query or existing.priority == request.priority):
+                existing.command = request.command
+                existing.frame = request.frame
+                existing.confirm = request.confirm
+                existing.readback = request.readback
+                if request.priority < existing.priority:
+                    self._queues[existing.priority].remove(existing)
+                    existing.priority = request.priority
+                    self._queues[existing.priority].append(existing)
+                forward_result(existing.future, request.future)
+                return False
+            self._queues[existing.priority].remove(existing)
+            self._length -= 1
+            forward_result(request.future, existing.future)
+
+        self._sequence += 1
+        request.sequence = self._sequence
+        if request.reply_type is None:
+            self._last_command = self._sequence
+        if front:
+            self._queues[request.priority].appendleft(request)
+        else:
+            self._queues[request.priority].append(request)
+        if key is not None:
+            self._pending[key] = request
+        self._length += 1
+        return True
+
+    def pop(self, window_full=False):
+        """
+        Remove and return the most urgent request that can be sent now.
+        While the in-flight window is full only commands without reply can;
+        safety commands without reply then pass queries of their own class.
+        """
+        for priority, queue in enumerate(self._queues):
+            if not queue:
+                continue
+            if not window_full or queue[0].reply_type is None:
+                request = queue.popleft()
+            elif priority == PRIORITY_SAFETY:
+                request = next((r for r in queue if r.reply_type is None), None)
+                if request is None:
+                    continue
+                queue.remove(request)
+            else:
+                continue
+            self._length -= 1
+            if request.coalesce_key is not None and self._pending.get(request.coalesce_key) is request:
+                del self._pending[request.coalesce_key]
+            return request
+        return None
+
+    def clear(self):
+        pending = []
+        for queue in self._queues:
+            pending.extend(queue)
+            queue.clear()
+        self._pending.clear()
+        self._length = 0
+        return pending
+
+class SerialLink(object):
+    """
+    Event driven I/O on an open serial connection.
+
+    The reader blocks in serial.read() until at least one byte arrives,
+    decodes every complete reply frame and hands it to
+    ``on_reply(frame, response_type, record)``. The writer sleeps on a
+    condition variable and sends queued commands as soon as they are queued.
+    Between commands the writer also wakes up for request timeouts and when
+    ``poll(now)`` is due; poll queues the due status queries and returns the
+    monotonic time it wants to be called again, so an idle link costs no CPU besides the read
+    timeout.
+
+    Every command gets a Future. Commands with a reply resolve with the
+    decoded record of the matching reply, others with an Acknowledgement
+    once written. At most ``max_in_flight`` answered commands are sent
+    ahead of their replies, which keeps polls pipelined without overrunning
+    the input buffer of the laser.
+
+    Commands are sent in priority order (see CommandScheduler) and the
+    writer waits until each frame has left the port before picking the next
+    one. A safety command therefore waits at most for one frame already on
+    the wire, see send_latency_bound(). The largest observed time from
+    queueing to the frame being on the wire is kept per priority class in
+    ``max_send_latency``.
+
+    If reading or writing fails (USB cable pulled, adapter reset) and
+    ``reopen()`` is given, the reader calls it to get a new connection, with
+    delays growing from ``reconnect_delay`` to ``max_reconnect_delay``
+    between attempts; reopen returns the open connection or None. Pending
+    commands are handled by ``pending_policy`` (PENDING_FLUSH or
+    PENDING_REPLAY), commands queued during the outage as well.
+    ``on_connection_change(connected, error)`` is called when the link is
+    lost and when it is back. The duration of every outage, from the
+    failure to the new connection, is appended to ``outages``.
+    """
+
+    def __init__(self, serial_connection, on_reply, decode, poll=None, framer=None,
+                 max_in_flight=3, readback_interval=0.05, reopen=None, pending_policy=PENDING_FLUSH,
+                 reconnect_delay=0.1, max_reconnect_delay=5.0, on_connection_change=None):
+        self.serial_connection = serial_connection
+        self.on_reply = on_reply
+        self.decode = decode
+        self.poll = poll
+        self._next_poll = 0.0
+        self.framer = framer if framer is not None else ReplyFramer()
+        self.max_in_flight = max_in_flight
+        self.readback_interval = readback_interval
+
+        self.reopen = reopen
+        self.pending_policy = pending_policy
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_connection_change = on_connection_change
+
+        self.alive = True
+        self.connected = True
+        self.outages = []
+        self._lost_time = None
+        self.decode_errors = 0
+        self.max_send_latency = [0.0, 0.0, 0.0]
+        self._outgoing = CommandScheduler()
+        self._in_flight = {}
+        self._in_flight_count = 0
+        self._condition = threading.Condition()
+        self._writer = None
+
+    def request(self, request):
+        """ Queue a CommandRequest, wake up the writer and return its future. """
+        with self._condition:
+            if not self.alive:
+                request.future.set_exception(LinkClosedError("Link is closed"))
+                return request.future
+            if not self.connected and self.pending_policy == PENDING_FLUSH:
+                request.future.set_exception(LinkLostError("Connection to the laser is lost"))
+                return request.future
+            request.queued_time = time.monotonic()
+            self._outgoing.push(request)
+            self._condition.notify()
+        return request.future
+
+    def send(self, frame):
+        """ Queue a raw request frame without reply tracking. """
+        return self.request(CommandRequest(None, frame))
+
+    def start(self):
+        self._writer = threading.Thread(target=self.run_writer, name="LaserLinkWriter")
+        self._writer.daemon = True
+        self._writer.start()
+
+    def stop(self):
+        with self._condition:
+            self.alive = False
+            self._condition.notify_all()
+        self._cancel_read()
+
+    def _cancel_read(self):
+        cancel_read = getattr(self.serial_connection, "cancel_read", None)
+        if cancel_read is not None:
+            try:
+                cancel_read()
+            except (OSError, ValueError):
+                pass
+
+    def join(self, timeout=None):
+        if self._writer is not None:
+            self._writer.join(timeout)
+
+    def _next_request(self):
+        #called with the condition held, returns None if nothing can be sent now
+        if not self.connected or not self._outgoing:
+            return None
+        return self._outgoing.pop(self._in_flight_count >= self.max_in_flight)
+
+    @staticmethod
+    def send_latency_bound(longest_frame, baud_rate, bits_per_byte=10):
+        """
+        Worst case time from queueing a safety command until its last byte
+        is on the wire: the frame being transmitted plus its own frame.
+        """
+        return 2 * longest_frame * bits_per_byte / float(baud_rate)
+
+    def reschedule_poll(self):
+        """ Call poll() again right away, e.g. after the poll intervals changed. """
+        with self._condition:
+            self._next_poll = 0.0
+            self._condition.notify()
+
+    def _wake_up_time(self):
+        wake_up = self._next_poll if self.poll is not None and self.connected else None
+        for queue in self._in_flight.values():
+            for request in queue:
+                if wake_up is None or request.deadline < wake_up:
+                    wake_up = request.deadline
+        return wake_up
+
+    def _expire(self, now):
+        #called with the condition held, returns the requests that failed
+        failed = []
+        for queue in self._in_flight.values():
+            for request in [r for r in queue if r.deadline <= now]:
+                queue.remove(request)
+                self._in_flight_count -= 1
+                if request.retries > 0:
+                    request.retries -= 1
+                    logging.debug("Retrying %s", request.command)
+                    self._outgoing.push(request, front=True)
+                else:
+                    failed.append(request)
+        return failed
+
+    def run_writer(self):
+        while True:
+            with self._condition:
+                request = None
+                failed = []
+                while self.alive:
+                    now = time.monotonic()
+                    failed = self._expire(now)
+                    request = self._next_request()
+                    if request is not None or failed or \
+                            (self.connected and self.poll is not None and now >= self._next_poll):
+                        break
+                    wake_up = self._wake_up_time()
+                    self._condition.wait(None if wake_up is None else max(0.0, wake_up - now))
+                if not self.alive:
+                    break
+                serial_connection = self.serial_connection
+                if request is not None and request.reply_type is not None:
+                    request.deadline = time.monotonic() + request.timeout
+                    self._in_flight.setdefault(request.reply_type, deque()).append(request)
+                    self._in_flight_count += 1
+
+            for r in failed:
+                logging.debug("No reply to %s", r.command)
+                self._resolve(r.future, exception=CommandTimeoutError("No reply to {}".format(r.command)))
+
+            if request is not None:
+                logging.debug("Sending message to laser: %r", request.frame)
+                try:
+                    serial_connection.write(request.frame)
+                    serial_connection.flush()
+                except (OSError, ValueError) as e:
+                    self._connection_failed(e, serial_connection, request if request.reply_type is None else None)
+                    continue
+                latency = time.monotonic() - request.queued_time
+                if latency > self.max_send_latency[request.priority]:
+                    self.max_send_latency[request.priority] = latency
+                if request.reply_type is None:
+                    self._written(request)
+
+            if self.poll is not None and time.monotonic() >= self._next_poll:
+                logging.debug("Queing laser status poll")
+                next_poll = self.poll(time.monotonic())
+                with self._condition:
+                    self._next_poll = next_poll if next_poll is not None else float("inf")
+
+        self._fail_pending()
+
+    def _written(self, request):
+        if request.confirm is None:
+            self._resolve(request.future, Acknowledgement(request.command, time.time()))
+            return
+        if request.deadline is None:
+            request.deadline = time.monotonic() + request.timeout
+        self._read_back(request)
+
+    def _read_back(self, request):
+        query_command, query_frame, predicate = request.confirm
+        query = self.request(CommandRequest(query_command, query_frame, query_command, request.timeout,
+                                            priority=request.priority))
+
+        def check(query):
+            if request.future.done():
+                return
+            exception = query.exception()
+            if exception is None and predicate(query.result()):
+                self._resolve(request.future, query.result())
+            elif isinstance(exception, (LinkClosedError, LinkLostError)):
+                #the link failed, not the setpoint
+                self._resolve(request.future, exception=exception)
+            elif not self.connected and self.pending_policy == PENDING_FLUSH:
+                self._resolve(request.future, exception=LinkLostError("Connection to the laser is lost"))
+            elif time.monotonic() < request.deadline:
+                timer = threading.Timer(self.readback_interval, self._read_back, (request,))
+                timer.daemon = True
+                timer.start()
+            elif request.retries > 0:
+                request.retries -= 1
+                request.deadline = None
+                self.request(request)
+            else:
+                self._resolve(request.future, exception=SetpointNotAppliedError(
+                    "{} was not applied".format(request.command)))
+
+        query.add_done_callback(check)
+
+    @staticmethod
+    def _resolve(future, result=None, exception=None):
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _fail_pending(self):
+        with self._condition:
+            pending = self._outgoing.clear()
+            for queue in self._in_flight.values():
+                pending.extend(queue)
+                queue.clear()
+            self._in_flight_count = 0
+        for request in pending:
+            self._resolve(request.future, exception=LinkClosedError("Link closed"))
+
+    def _reply_received(self, message):
+        try:
+            response_type, record = self.decode(message)
+        except LaserProtocolError as e:
+            self.decode_errors += 1
+            logging.critical("Discarding reply: {}".format(e))
+            return
+
+        request = None
+        with self._condition:
+            queue = self._in_flight.get(response_type)
+            if queue:
+                request = queue.popleft()
+                self._in_flight_count -= 1
+                self._condition.notify()
+        #apply the reply before waking the caller, so a caller reading the
+        #handler status after its result already sees this reply
+        try:
+            self.on_reply(message, response_type, record)
+        finally:
+            if request is not None:
+                self._resolve(request.future, record)
+
+    def run_reader(self):
+        framer = self.framer
+        while self.alive:
+            serial_connection = self.serial_connection
+            try:
+                data = serial_connection.read(serial_connection.in_waiting or 1)
+                if not data:
+                    if not self.connected:
+                        #the writer failed, the reader has to reconnect
+                        raise LinkLostError("Writing to the laser failed")
+                    continue
+                waiting_bytes = serial_connection.in_waiting
+                if waiting_bytes:
+                    data += serial_connection.read(waiting_bytes)
+            except (OSError, ValueError) as e:
+                if not self.alive:
+                    break
+                self._connection_failed(e, serial_connection)
+                if self.reopen is None:
+                    self.stop()
+                    break
+                self._reconnect()
+                continue
+            for frame in framer.feed(data):
+                self._reply_received(bytes(frame))
+
+    def _connection_failed(self, error, serial_connection, unsent=None):
+        """
+        Mark the link as lost if ``serial_connection`` is the current one
+        and deal with pending commands according to the pending policy.
+        ``unsent`` is a request without reply whose frame could not be
+        written. Called from the reader and the writer.
+        """
+        with self._condition:
+            pending = [unsent] if unsent is not None else []
+            if self.connected and serial_connection is self.serial_connection:
+                logging.critical("Connection to the laser lost: {}".format(error))
+                self.connected = False
+                self._lost_time = time.monotonic()
+                for queue in self._in_flight.values():
+                    pending.extend(queue)
+                    queue.clear()
+                self._in_flight_count = 0
+                if self.pending_policy == PENDING_FLUSH:
+                    pending.extend(self._outgoing.clear())
+                else:
+                    for request in reversed(pending):
+                        request.deadline = None
+                        self._outgoing.push(request, front=True)
+                    pending = []
+                notify = True
+            else:
+                notify = False
+                if self.pending_policy != PENDING_FLUSH:
+                    for request in pending:
+                        self._outgoing.push(request, front=True)
+                    pending = []
+            self._condition.notify_all()
+        if notify:
+            #make the reader notice a failed write right away
+            self._cancel_read()
+        for request in pending:
+            self._resolve(request.future, exception=LinkLostError(
+                "Connection lost before {} completed: {}".format(request.command, error)))
+        if notify and self.on_connection_change is not None:
+            self.on_connection_change(False, error)
+
+    def _reconnect(self):
+        """ Reopen the connection with growing delays until it works or the link is stopped. """
+        try:
+            self.serial_connection.close()
+        except (OSError, ValueError):
+            pass
+        delay = self.reconnect_delay
+        connection = None
+        while self.alive:
+            try:
+                connection = self.reopen()
+            except (OSError, ValueError) as e:
+                logging.info("Reconnecting failed: {}".format(e))
+            if connection is not None:
+                break
+            with self._condition:
+                if self.alive:
+                    self._condition.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+        if connection is None:
+            return
+        if not self.alive:
+            connection.close()
+            return
+
+        self.framer.reset()
+        with self._condition:
+            self.serial_connection = connection
+            self.connected = True
+            outage = time.monotonic() - self._lost_time
+            self.outages.append(outage)
+            self._next_poll = 0.0
+            self._condition.notify_all()
+        logging.info("Connection to the laser recovered after {:.3f} s".format(outage))
+        if self.on_connection_change is not None:
+            self.on_connection_change(True, None)
+
+
+class PollTarget(object):
+    """
+    A periodically sent query. It is polled every ``interval`` seconds while
+    the laser is firing or its state just changed, and backs off by the
+    scheduler's factor on every unchanged reply up to ``idle_interval``.
+    ``frame_bits`` is the cost of one poll, request plus the longest reply
+    seen so far (or the expected one before the first reply).
+    """
+    __slots__ = ("command", "interval", "idle_interval", "current_interval", "next_due", "request_bits",
+                 "frame_bits")
+
+    def __init__(self, command, interval, idle_interval):
+        self.command = command
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self.current_interval = interval
+        self.next_due = None
+        self.request_bits = 0
+        self.frame_bits = 0
+
+
+# command, interval while active, interval when idle for long [s]
+DEFAULT_POLL_TARGETS = (
+    ("GetStat7", 0.2, 2.0),
+    ("GetShortStatus", 0.5, 2.0),
+    ("GetStat8", 1.0, 10.0),
+    ("GetEnergyValues", 1.0, 10.0),
+    ("GetSernum", 5.0, 60.0),
+    ("GetAttenuatorStatus", 60.0, 600.0),
+    ("GetVer3", 300.0, 3600.0),
+)
+
+
+def _same_record(previous, record):
+    """ True if two records of a reply type are equal, samples only while both have none. """
+    for a, b in zip(previous, record):
+        if hasattr(a, "shape") or hasattr(b, "shape"):
+            if len(a) or len(b):
+                return False
+        elif a != b:
+            return False
+    return True
+
+
+class PollScheduler(object):
+    """
+    Decides which status queries are due.
+
+    Every query has its own interval. While the laser is idle the intervals
+    grow with every unchanged reply and a query whose reply changed returns
+    to its active interval; as soon as the operating state reported by
+    GetStat7 or GetShortStatus changes, or while the laser is firing, all
+    queries fall back to their active interval. On top of that the polling
+    load is kept below ``bus_fraction`` of the link capacity: if the current
+    intervals would need more, all of them are stretched by the same factor.
+
+    ``frame_lengths`` maps each command to the bytes of its request and of
+    its expected reply. Replies can be longer (GetEnergyValues carries up to
+    255 samples), so observe() costs every query with the longest reply
+    seen. observe() is called from the reader, due() from the writer.
+    Queries polled less often than every ``defer_first_poll`` seconds wait
+    one interval before their first poll, so connecting only costs the
+    status queries.
+    """
+
+    def __init__(self, frame_lengths, targets=DEFAULT_POLL_TARGETS, baud_rate=9600, bus_fraction=0.25,
+                 backoff=1.5, bits_per_byte=10, defer_first_poll=2.0):
+        self.targets = dict((command, PollTarget(command, interval, idle_interval))
+                            for command, interval, idle_interval in targets)
+        for target in self.targets.values():
+            request_length, reply_length = frame_lengths[target.command]
+            target.request_bits = request_length * bits_per_byte
+            target.frame_bits = (request_length + reply_length) * bits_per_byte
+        self.bits_per_byte = bits_per_byte
+        self.budget = bus_fraction * baud_rate
+        self.backoff = backoff
+        self.defer_first_poll = defer_first_poll
+        self.interval_scale = 1.0
+        self.firing = False
+        self._state = {}
+        self._stretch = 1.0
+        self._lock = threading.Lock()
+        self._update_stretch()
+
+    def load(self):
+        """ Bits per second the polls currently take, budget included. """
+        with self._lock:
+            return sum(t.frame_bits / (t.current_interval * self.interval_scale * self._stretch)
+                       for t in self.targets.values())
+
+    def _update_stretch(self):
+        demand = sum(t.frame_bits / (t.current_interval * self.interval_scale) for t in self.targets.values())
+        self._stretch = max(1.0, demand / self.budget)
+
+    def _interval(self, target):
+        return target.current_interval * self.interval_scale * self._stretch
+
+    def set_interval_scale(self, scale):
+        with self._lock:
+            self.interval_scale = scale
+            self._update_stretch()
+
+    def remove(self, command):
+        """ Stop polling a query, e.g. one the laser does not support. """
+        with self._lock:
+            if self.targets.pop(command, None) is not None:
+                self._update_stretch()
+
+    def due(self, now):
+        """ Return the commands due at ``now`` and the time of the next due one. """
+        commands = []
+        with self._lock:
+            next_due = None
+            for target in self.targets.values():
+                if target.next_due is None:
+                    target.next_due = now
+                    if target.interval > self.defer_first_poll:
+                        target.next_due += self._interval(target)
+                if target.next_due <= now:
+                    commands.append(target.command)
+                    target.next_due = now + self._interval(target)
+                if next_due is None or target.next_due < next_due:
+                    next_due = target.next_due
+        return commands, next_due
+
+    def observe(self, response_type, record, reply_length=None):
+        """
+        Adapt the intervals to a decoded reply, ``reply_length`` is the
+        length of its frame without the end delimiter. Returns True if they were tightened, so the caller can reschedule
+        the next poll.
+        """
+        with self._lock:
+            target = self.targets.get(response_type)
+            if target is not None and reply_length is not None:
+                target.frame_bits = max(target.frame_bits, target.request_bits + (reply_length + 1) * self.bits_per_byte)
+            tightened = False
+            if response_type == "GetStat7":
+                self.firing = bool(record.repetition_on or record.burst_on or record.external_trigger_on)
+            previous = self._state.get(response_type)
+            self._state[response_type] = record
+            changed = previous is not None and not _same_record(previous, record)
+            if changed and response_type in ("GetStat7", "GetShortStatus"):
+                tightened = self._tighten()
+
+            if target is not None and not tightened:
+                if self.firing or changed:
+                    target.current_interval = target.interval
+                else:
+                    target.current_interval = min(target.current_interval * self.backoff, target.idle_interval)
+                self._update_stretch()
+            return tightened
+
+    def _tighten(self):
+        tightened = False
+        for target in self.targets.values():
+            if target.current_interval != target.interval:
+                target.current_interval = target.interval
+                if target.next_due is not None:
+                    target.next_due = min(target.next_due, time.monotonic() + target.interval)
+                tightened = True
+        self._update_stretch()
+        return tightened